@@ -0,0 +1,24 @@
+"""
+Бюджеты страниц для бенчмарков.
+
+queries — сколько SQL-запросов может сделать страница с холодным кэшем,
+не зависит от объёма данных. ms — предел медианного времени ответа
+с холодным кэшем на любом из масштабов.
+"""
+
+BUDGETS = {
+    'index': {'queries': 3, 'ms': 250},
+    'index_last_page': {'queries': 3, 'ms': 250},
+    'group_posts': {'queries': 4, 'ms': 250},
+    'profile': {'queries': 5, 'ms': 250},
+    'post_detail': {'queries': 7, 'ms': 250},
+    'follow_index': {'queries': 6, 'ms': 250},
+}
+
+# объём данных для generate_dataset на каждом масштабе; какие масштабы
+# запускать, задаёт переменная окружения BENCH_SCALES
+SCALES = {
+    'small': {'users': 200, 'groups': 10, 'posts': 2000},
+    'medium': {'users': 2000, 'groups': 50, 'posts': 20000},
+    'large': {'users': 20000, 'groups': 200, 'posts': 200000},
+}
@@ -0,0 +1,69 @@
+import json
+import os
+import platform
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+from .budgets import SCALES
+
+OUTPUT = os.environ.get(
+    'BENCH_OUTPUT', os.path.join(os.path.dirname(__file__), 'results.json')
+)
+SEED = os.environ.get('BENCH_SEED', '0')
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        names = os.environ.get('BENCH_SCALES', 'small').split(',')
+        metafunc.parametrize('scale', names, indirect=True, scope='session')
+
+
+@pytest.fixture(scope='session')
+def results():
+    """Замеры всех тестов; пишутся в BENCH_OUTPUT в конце сессии."""
+    collected = []
+    yield collected
+    with open(OUTPUT, 'w', encoding='utf-8') as file:
+        json.dump({
+            'seed': SEED,
+            'python': platform.python_version(),
+            'results': collected,
+        }, file, ensure_ascii=False, indent=2)
+
+
+@pytest.fixture(scope='session')
+def scale(request, django_db_setup, django_db_blocker):
+    """
+    Масштаб данных: база заполняется generate_dataset один раз на масштаб.
+
+    Возвращает имя масштаба и объекты, на страницах которых больше всего
+    данных: самую большую группу, самого активного автора, самый
+    обсуждаемый пост и читателя с самой большой лентой.
+    """
+    from posts.models import Group, Post, User
+
+    name = request.param
+    options = SCALES[name]
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
+        call_command(
+            'generate_dataset', seed=SEED, workers=os.cpu_count(),
+            end='2021-01-01', stdout=StringIO(),
+            **options,
+        )
+        targets = {
+            'group': Group.objects.annotate(
+                total=Count('posts')
+            ).order_by('-total').first(),
+            'author': User.objects.annotate(
+                total=Count('posts')
+            ).order_by('-total').first(),
+            'post': Post.objects.order_by('-comment_count').first(),
+            'reader': User.objects.annotate(
+                total=Count('feed')
+            ).order_by('-total').first(),
+        }
+    return {'name': name, 'size': options, **targets}
@@ -0,0 +1,74 @@
+import statistics
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from core.instrumentation import measure
+
+from .budgets import BUDGETS
+
+ROUNDS = 5
+
+
+def pages(scale):
+    return {
+        'index': (reverse('posts:index'), None),
+        'index_last_page': (f"{reverse('posts:index')}?before=last", None),
+        'group_posts': (
+            reverse('posts:group_posts', args=[scale['group'].slug]), None
+        ),
+        'profile': (
+            reverse('posts:profile', args=[scale['author'].username]), None
+        ),
+        'post_detail': (
+            reverse('posts:post_detail', args=[scale['post'].pk]), None
+        ),
+        'follow_index': (reverse('posts:follow_index'), scale['reader']),
+    }
+
+
+def run(client, url, cold):
+    if cold:
+        cache.clear()
+    with measure() as measurement:
+        response = client.get(url)
+    assert response.status_code == 200
+    return measurement
+
+
+def summary(measurements):
+    return {
+        key: statistics.median(m[key] for m in measurements)
+        for key in measurements[0]
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('view', list(BUDGETS))
+def test_view_within_budget(view, scale, results):
+    url, user = pages(scale)[view]
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    run(client, url, cold=True)
+    cold = summary([run(client, url, cold=True) for _ in range(ROUNDS)])
+    warm = summary([run(client, url, cold=False) for _ in range(ROUNDS)])
+    budget = BUDGETS[view]
+    results.append({
+        'view': view,
+        'scale': scale['name'],
+        'size': scale['size'],
+        'url': url,
+        'cold': cold,
+        'warm': warm,
+        'budget': budget,
+    })
+    assert cold['queries'] <= budget['queries'], (
+        f"{view}: {cold['queries']} запросов при бюджете "
+        f"{budget['queries']}"
+    )
+    assert cold['wall_ms'] <= budget['ms'], (
+        f"{view}: {cold['wall_ms']:.1f} мс при бюджете {budget['ms']} мс"
+    )
@@ -0,0 +1,33 @@
+import pytest
+from django.test import override_settings
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache(tmp_path_factory):
+    """
+    Кэш и метрики тестов — во временном каталоге, а не в yatube/cache.
+
+    То же делает TEST_RUNNER для manage.py test.
+    """
+    from core import metrics
+    from core.test_runner import isolated_settings
+
+    with override_settings(**isolated_settings(
+        str(tmp_path_factory.mktemp('yatube'))
+    )):
+        yield
+        metrics.close()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """
+    После теста дожидается фоновых миниатюр, поставленных его запросами.
+
+    Транзакционные тесты очищают базу и файлы сразу после теста, и пул
+    не должен в это время писать в них.
+    """
+    yield
+    from posts import thumbnails
+
+    thumbnails.shutdown()
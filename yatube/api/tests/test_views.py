@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'HasNoName'
+READER = 'Reader'
+SLUG = 'test-slug'
+INDEX_URL = reverse('api:index')
+GROUP_URL = reverse('api:group_posts', args=[SLUG])
+PROFILE_URL = reverse('api:profile', args=[USERNAME])
+FOLLOW_URL = reverse('api:follow_index')
+MISSING_GROUP_URL = reverse('api:group_posts', args=['missing'])
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=READER)
+        cls.group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(settings.MAX_NUM_POSTS_PER_PAGE + 2)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.DETAIL_URL = reverse('api:post_detail', args=[cls.post.pk])
+        cls.COMMENTS_URL = reverse('api:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        self.guest = Client()
+        self.authorized = Client()
+        self.authorized.force_login(self.reader)
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты отдаются страницами по курсору"""
+        for url, client in (
+            (INDEX_URL, self.guest),
+            (GROUP_URL, self.guest),
+            (PROFILE_URL, self.guest),
+            (FOLLOW_URL, self.authorized),
+        ):
+            with self.subTest(url=url):
+                first = client.get(url).json()
+                self.assertEqual(
+                    len(first['results']), settings.MAX_NUM_POSTS_PER_PAGE
+                )
+                self.assertEqual(first['results'][0]['id'], self.post.pk)
+                self.assertIsNone(first['previous'])
+                second = client.get(url, {'after': first['next']}).json()
+                self.assertEqual(
+                    [post['id'] for post in second['results']],
+                    [post.pk for post in self.posts[1::-1]],
+                )
+                self.assertIsNone(second['next'])
+
+    def test_post_fields(self):
+        """Пост сериализуется со всеми полями по умолчанию"""
+        post = self.guest.get(INDEX_URL).json()['results'][0]
+        self.assertEqual(post, {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': post['pub_date'],
+            'author': USERNAME,
+            'group': SLUG,
+            'image': None,
+            'comment_count': 1,
+        })
+
+    def test_sparse_fieldsets(self):
+        """?fields= ограничивает поля, неизвестные поля дают 400"""
+        response = self.guest.get(INDEX_URL, {'fields': 'id,author'})
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.pk, 'author': USERNAME},
+        )
+        response = self.guest.get(INDEX_URL, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['fields'], ['password'])
+
+    def test_feeds_skip_model_instances(self):
+        """Страница ленты читается одним запросом"""
+        with self.assertNumQueries(1):
+            self.guest.get(INDEX_URL)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с первой страницей комментариев"""
+        data = self.guest.get(self.DETAIL_URL, {'fields': 'text'}).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertNotIn('id', data)
+        self.assertEqual(data['comments']['results'][0]['author'], READER)
+        comments = self.guest.get(self.COMMENTS_URL).json()
+        self.assertEqual(comments['results'], data['comments']['results'])
+
+    def test_errors(self):
+        """Ошибки отдаются в JSON"""
+        self.assertEqual(self.guest.get(FOLLOW_URL).status_code, 401)
+        response = self.guest.get(MISSING_GROUP_URL)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+        self.assertEqual(
+            self.guest.get(reverse('api:post_detail', args=[0])).status_code,
+            404
+        )
+        self.assertEqual(self.guest.post(INDEX_URL).status_code, 405)
+
+    def test_etag(self):
+        """Неизменившийся ответ с тем же ETag отдаётся как 304"""
+        etag = self.guest.get(INDEX_URL)['ETag']
+        response = self.guest.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый', author=self.author)
+        response = self.guest.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.index, name='index'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/', views.post_comments,
+        name='post_comments'
+    ),
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    path(
+        'profiles/<str:username>/posts/', views.profile, name='profile'
+    ),
+    path('follow/', views.follow_index, name='follow_index'),
+]
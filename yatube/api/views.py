@@ -0,0 +1,166 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from posts.models import Group, Post, User
+from posts.paginator import CursorPaginator
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def respond(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def api_view(view):
+    """
+    Отвечает ошибками в JSON и ставит ETag по телу ответа.
+
+    На повторный запрос с тем же If-None-Match отдаётся 304 без тела.
+    """
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+        except Http404:
+            return respond({'detail': 'Не найдено'}, 404)
+        except InvalidFields as error:
+            return respond(
+                {'detail': 'Неизвестные поля', 'fields': error.args[0]}, 400
+            )
+        patch_vary_headers(response, ('Cookie',))
+        if response.status_code != 200:
+            return response
+        etag = '"{}"'.format(hashlib.md5(response.content).hexdigest())
+        response['ETag'] = etag
+        return get_conditional_response(request, etag, response=response)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=id,text; без параметра — все доступные."""
+    names = [
+        name.strip()
+        for name in request.GET.get('fields', '').split(',') if name.strip()
+    ]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise InvalidFields(unknown)
+    return names or list(available)
+
+
+def serialize(row, names, available):
+    item = {name: row[available[name]] for name in names}
+    if 'image' in item:
+        item['image'] = Post._meta.get_field('image').storage.url(
+            item['image']
+        ) if item['image'] else None
+    return item
+
+
+def paginated(request, queryset, names, available, per_page, keys):
+    """
+    Страница по курсору из словарей .values() без создания моделей.
+
+    Ключи курсора выбираются всегда, но в ответ попадают только поля names.
+    """
+    lookups = {available[name] for name in names} | set(keys)
+    page_obj = CursorPaginator(
+        queryset.values(*lookups), per_page, keys
+    ).get_page(request.GET.get('after'), request.GET.get('before'))
+    return {
+        'results': [serialize(row, names, available) for row in page_obj],
+        'next': page_obj.paginator.next_cursor,
+        'previous': page_obj.paginator.previous_cursor,
+    }
+
+
+def posts_page(request, queryset, keys=('pub_date', 'id')):
+    return respond(paginated(
+        request, queryset, requested_fields(request, POST_FIELDS),
+        POST_FIELDS, settings.MAX_NUM_POSTS_PER_PAGE, keys
+    ))
+
+
+def comments_page(request, post_id, names):
+    return paginated(
+        request, Post(pk=post_id).comments.all(), names, COMMENT_FIELDS,
+        settings.MAX_NUM_COMMENTS_PER_PAGE, ('created', 'id')
+    )
+
+
+@api_view
+def index(request):
+    return posts_page(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return posts_page(request, Post.objects.filter(group=group))
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return posts_page(request, Post.objects.filter(author=author))
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return respond({'detail': 'Требуется авторизация'}, 401)
+    posts = Post.objects.filter(feed_entries__user=request.user).annotate(
+        feed_date=F('feed_entries__pub_date'),
+        feed_post=F('feed_entries__post'),
+    )
+    return posts_page(request, posts, keys=('feed_date', 'feed_post'))
+
+
+@api_view
+def post_detail(request, post_id):
+    """Пост с первой страницей комментариев; ?fields= — поля поста."""
+    names = requested_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in names}
+    ).first()
+    if row is None:
+        raise Http404
+    post = serialize(row, names, POST_FIELDS)
+    post['comments'] = comments_page(request, post_id, list(COMMENT_FIELDS))
+    return respond(post)
+
+
+@api_view
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return respond(comments_page(
+        request, post_id, requested_fields(request, COMMENT_FIELDS)
+    ))
@@ -0,0 +1,160 @@
+import os
+import pickle
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+from . import metrics
+
+STAMP_KEY = '{}:stamp'
+# без суффикса .djcache: clear() и отсев старых записей его не трогают
+ADD_LOCK_FILE = 'add.lock'
+
+
+class FileCache(FileBasedCache):
+    """
+    Файловый кэш с атомарным add.
+
+    В FileBasedCache add — это has_key и затем set, и два процесса могут
+    оба увидеть, что ключа нет, и оба получить True. Здесь проверка и
+    запись идут под исключительной блокировкой файла в каталоге кэша,
+    общей для всех процессов на этом диске.
+    """
+
+    def _exclusive(self):
+        self._createdir()
+        lock = open(os.path.join(self._dir, ADD_LOCK_FILE), 'ab')
+        locks.lock(lock, locks.LOCK_EX)
+        return lock
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._exclusive():
+            return super().add(key, value, timeout, version)
+
+
+class TwoTierCache(BaseCache):
+    """
+    Кэш из двух уровней: LRU в памяти процесса (L1) перед общим кэшем (L2).
+
+    LOCATION — алиас общего кэша в CACHES, OPTIONS['MAX_ENTRIES'] — размер
+    L1. Рядом с каждым значением в L2 лежит штамп версии. L1 отдаёт своё
+    значение, только если штамп в L2 не изменился, поэтому запись или
+    удаление в одном процессе сразу видны остальным, а процесс с тёплым L1
+    не читает и не распаковывает из L2 большие значения.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._shared_alias = location
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _remember(self, key, stamp, data):
+        with self._lock:
+            self._local[key] = stamp, data
+            self._local.move_to_end(key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _recall(self, key, stamp):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _forget(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    @staticmethod
+    def _entry(value):
+        return uuid.uuid4().hex, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def get_many(self, keys, version=None):
+        stamps = self.shared.get_many(
+            [STAMP_KEY.format(key) for key in keys], version
+        )
+        found, missing = {}, []
+        for key in keys:
+            stamp = stamps.get(STAMP_KEY.format(key))
+            if stamp is None:
+                continue
+            data = self._recall(self.make_key(key, version), stamp)
+            if data is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(data)
+        local = len(found)
+        for key, (stamp, data) in self.shared.get_many(
+            missing, version
+        ).items():
+            self._remember(self.make_key(key, version), stamp, data)
+            found[key] = pickle.loads(data)
+        self._count(local, len(found) - local, len(keys) - len(found))
+        return found
+
+    @staticmethod
+    def _count(local, shared, missed):
+        for tier, result, amount in (
+            ('local', 'hit', local),
+            ('shared', 'hit', shared),
+            ('shared', 'miss', missed),
+        ):
+            metrics.increment(
+                'yatube_cache_lookups_total', amount, tier=tier,
+                result=result,
+            )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        entries = {}
+        for key, value in data.items():
+            stamp, pickled = entries[key] = self._entry(value)
+            entries[STAMP_KEY.format(key)] = stamp
+            self._remember(self.make_key(key, version), stamp, pickled)
+        self.shared.set_many(entries, self._timeout(timeout), version)
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        stamp, data = entry = self._entry(value)
+        if not self.shared.add(key, entry, timeout, version):
+            return False
+        self.shared.set(STAMP_KEY.format(key), stamp, timeout, version)
+        self._remember(self.make_key(key, version), stamp, data)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        return (
+            self.shared.touch(key, timeout, version)
+            and self.shared.touch(STAMP_KEY.format(key), timeout, version)
+        )
+
+    def delete(self, key, version=None):
+        self._forget(self.make_key(key, version))
+        self.shared.delete_many([key, STAMP_KEY.format(key)], version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
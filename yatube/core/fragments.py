@@ -0,0 +1,36 @@
+import re
+
+from django.template.loader import render_to_string
+
+HOLE = '<!--fragment:{}-->'
+HOLE_RE = re.compile(r'<!--fragment:(\d+)-->')
+
+
+def render_fragment(request, template_name, kwargs):
+    """Рендерит фрагмент только из его аргументов и контекста запроса."""
+    return render_to_string(template_name, kwargs, request)
+
+
+def punch(request, template_name, kwargs):
+    """
+    Оставляет в общей для всех пользователей странице метку фрагмента.
+
+    Если страница рендерится не для общего кэша, фрагмент выводится сразу.
+    Пользовательский текст экранируется шаблонами, поэтому подделать
+    метку из содержимого постов нельзя.
+    """
+    holes = getattr(request, 'page_cache_holes', None)
+    if holes is None:
+        return render_fragment(request, template_name, kwargs)
+    holes.append((template_name, kwargs))
+    return HOLE.format(len(holes) - 1)
+
+
+def stitch(request, response, holes):
+    """Подставляет в закэшированную страницу фрагменты текущего запроса."""
+    content = response.content.decode(response.charset)
+    response.content = HOLE_RE.sub(
+        lambda match: render_fragment(request, *holes[int(match[1])]),
+        content
+    )
+    return response
@@ -0,0 +1,84 @@
+"""
+Замеры запроса: время, SQL-запросы, прочитанные строки, рендеринг.
+
+Используется бенчмарками и нагрузочными командами; в обработке обычных
+запросов не участвует.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from django.template.base import Template
+from django.test.utils import CaptureQueriesContext
+
+
+def _counting_cursor(measurement):
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        measurement['rows'] += row is not None
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self.cursor.fetchmany(
+            self.cursor.arraysize if size is None else size
+        )
+        measurement['rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        measurement['rows'] += len(rows)
+        return rows
+
+    return {
+        'fetchone': fetchone,
+        'fetchmany': fetchmany,
+        'fetchall': fetchall,
+    }
+
+
+def _timed_render(measurement, render):
+    depth = [0]
+
+    def timed(self, context):
+        """Время считается только у внешних шаблонов, без вложенных."""
+        depth[0] += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            depth[0] -= 1
+            if not depth[0]:
+                measurement['render_ms'] += (
+                    time.perf_counter() - start
+                ) * 1000
+    return timed
+
+
+@contextmanager
+def measure():
+    """
+    Собирает замеры кода внутри блока в словарь.
+
+    Ключи: wall_ms — общее время, queries — число SQL-запросов, rows —
+    строки, прочитанные из курсоров, render_ms — время рендеринга
+    шаблонов верхнего уровня. Словарь заполняется при выходе из блока.
+    """
+    measurement = {'wall_ms': 0.0, 'queries': 0, 'rows': 0, 'render_ms': 0.0}
+    with ExitStack() as stack:
+        queries = stack.enter_context(CaptureQueriesContext(connection))
+        for name, method in _counting_cursor(measurement).items():
+            stack.enter_context(
+                mock.patch.object(CursorWrapper, name, method, create=True)
+            )
+        stack.enter_context(mock.patch.object(
+            Template, 'render', _timed_render(measurement, Template.render)
+        ))
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            measurement['wall_ms'] = (time.perf_counter() - start) * 1000
+            measurement['queries'] = len(queries)
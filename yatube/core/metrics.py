@@ -0,0 +1,310 @@
+"""
+Метрики в текстовом формате Prometheus, общие для всех процессов.
+
+Процесс копит значения в памяти и не чаще раза в METRICS_FLUSH_INTERVAL
+секунд записывает их в свой файл <pid>-<метка>.json в METRICS_DIR (по
+умолчанию в /dev/shm, то есть в общей памяти). /metrics складывает файлы
+всех процессов, поэтому счётчики не теряются, какой бы воркер ни ответил
+на запрос Prometheus.
+
+Итоги завершившихся процессов переносятся в archive.json, а их файлы
+удаляются, как mark_process_dead в prometheus_client: при выходе это
+делает сам процесс, а за убитыми — следующий сбор. Случайная метка
+в имени не даёт новому процессу с тем же pid перезаписать файл прежнего.
+Каталог стоит очищать при перезапуске сервера.
+"""
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files import locks
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+METRICS = {
+    'yatube_http_requests_total': (
+        'counter', 'Ответы по представлениям, методам и статусам.'
+    ),
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время ответа представления.'
+    ),
+    'yatube_http_response_size_bytes': (
+        'histogram', 'Размер тела ответа.'
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы, сделанные при ответе.'
+    ),
+    'yatube_db_query_duration_seconds_total': (
+        'counter', 'Время SQL-запросов при ответе.'
+    ),
+    'yatube_template_render_duration_seconds_total': (
+        'counter', 'Время рендеринга шаблонов при ответе.'
+    ),
+    'yatube_cache_lookups_total': (
+        'counter', 'Чтения ключей кэша: уровень и результат.'
+    ),
+    'yatube_page_cache_events_total': (
+        'counter', 'События кэша страниц: hit, miss, stale, lock_wait.'
+    ),
+}
+
+_lock = threading.Lock()
+_values = {}
+_state = {'flushed': 0.0, 'tag': uuid.uuid4().hex[:8]}
+ARCHIVE = 'archive.json'
+LOCK = 'archive.lock'
+_request = threading.local()
+
+
+def _key(name, suffix, labels):
+    return name, suffix, tuple(sorted(labels.items()))
+
+
+def increment(name, amount=1, **labels):
+    key = _key(name, '', labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def value(name, **labels):
+    """Значение счётчика в этом процессе."""
+    with _lock:
+        return _values.get(_key(name, '', labels), 0)
+
+
+def observe(name, value, buckets, **labels):
+    """Наблюдение гистограммы: корзины le накопительные, как в Prometheus."""
+    with _lock:
+        for bound in buckets + (math.inf,):
+            key = _key(name, '_bucket', {**labels, 'le': _number(bound)})
+            _values[key] = _values.get(key, 0) + (value <= bound)
+        for suffix, amount in (('_sum', value), ('_count', 1)):
+            key = _key(name, suffix, labels)
+            _values[key] = _values.get(key, 0) + amount
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def directory():
+    return settings.METRICS_DIR
+
+
+def _own_file():
+    return os.path.join(directory(), f'{os.getpid()}-{_state["tag"]}.json')
+
+
+def _read(path):
+    """Значения из файла процесса или архива; пропавший файл — пустой."""
+    try:
+        with open(path) as samples:
+            rows = json.load(samples)
+    except (OSError, ValueError):
+        # процесс мог как раз заменить или удалить файл
+        return {}
+    return {
+        (family, suffix, tuple(tuple(label) for label in labels)): value
+        for family, suffix, labels, value in rows
+    }
+
+
+def _write(path, values):
+    """Записывает файл целиком: читатели видят старую или новую версию."""
+    handle, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp'
+    )
+    with os.fdopen(handle, 'w') as output:
+        json.dump([
+            [name, suffix, list(labels), value]
+            for (name, suffix, labels), value in values.items()
+        ], output)
+    os.replace(temporary, path)
+
+
+def _add(total, values):
+    for key, value in values.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def _locked():
+    """Блокировка архива: сбор и перенос в архив не пересекаются."""
+    os.makedirs(directory(), exist_ok=True)
+    lock = open(os.path.join(directory(), LOCK), 'ab')
+    locks.lock(lock, locks.LOCK_EX)
+    return lock
+
+
+def flush(force=False):
+    """Записывает значения процесса в его файл, если пора или force."""
+    now = time.monotonic()
+    if not force and now - _state['flushed'] < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _state['flushed'] = now
+    with _lock:
+        values = dict(_values)
+    os.makedirs(directory(), exist_ok=True)
+    _write(_own_file(), values)
+
+
+def _alive(name):
+    pid = name.partition('-')[0]
+    if not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _archive(paths):
+    """Переносит файлы процессов в архив; вызывается под _locked()."""
+    if not paths:
+        return
+    archive = os.path.join(directory(), ARCHIVE)
+    total = _read(archive)
+    for path in paths:
+        _add(total, _read(path))
+    _write(archive, total)
+    for path in paths:
+        os.remove(path)
+
+
+def _forget_in_child():
+    """
+    Дочерний процесс после fork не должен повторно сдать значения
+    и писать в файл родителя.
+    """
+    with _lock:
+        _values.clear()
+    _state['tag'] = uuid.uuid4().hex[:8]
+
+
+os.register_at_fork(after_in_child=_forget_in_child)
+
+
+@atexit.register
+def close():
+    """
+    Переносит значения процесса в архив и начинает счёт заново.
+
+    Вызывается при выходе, а тестами — пока METRICS_DIR ещё временный.
+    """
+    # файл заводят только процессы, которые отвечали на запросы
+    if not _state['flushed']:
+        return
+    flush(force=True)
+    with _locked():
+        _archive([_own_file()])
+    with _lock:
+        _values.clear()
+    _state['flushed'] = 0.0
+
+
+def collect():
+    """
+    Сумма значений из файлов всех процессов и архива.
+
+    Файлы процессов, которых уже нет, попутно переносятся в архив.
+    """
+    path = directory()
+    if not os.path.isdir(path):
+        return {}
+    total = {}
+    with _locked():
+        names = [name for name in os.listdir(path) if name.endswith('.json')]
+        _archive([
+            os.path.join(path, name) for name in names
+            if name != ARCHIVE and not _alive(name)
+        ])
+        for name in os.listdir(path):
+            if name.endswith('.json'):
+                _add(total, _read(os.path.join(path, name)))
+    return total
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def _order(item):
+    (name, suffix, labels), _ = item
+    others = tuple(label for label in labels if label[0] != 'le')
+    bound = dict(labels).get('le')
+    return name, others, suffix, float(bound) if bound else 0.0
+
+
+def render(values):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines, family = [], None
+    for (name, suffix, labels), value in sorted(values.items(), key=_order):
+        if name != family:
+            family = name
+            kind, description = METRICS.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+        text = ','.join(f'{label}="{_escape(v)}"' for label, v in labels)
+        lines.append(
+            f'{name}{suffix}{{{text}}} {_number(value)}'
+            if text else f'{name}{suffix} {_number(value)}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+class RequestTimings:
+    """Запросы к базе и рендеринг внутри одного ответа."""
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_seconds += time.perf_counter() - start
+
+
+def begin(request):
+    _request.timings = RequestTimings(request)
+    return _request.timings
+
+
+def end():
+    _request.timings = None
+
+
+def current_request():
+    """Запрос, который обрабатывает этот поток, или None."""
+    timings = getattr(_request, 'timings', None)
+    return timings.request if timings is not None else None
+
+
+def add_render(seconds):
+    """Время рендеринга шаблона; вне запроса не учитывается."""
+    timings = getattr(_request, 'timings', None)
+    if timings is not None:
+        timings.render_seconds += seconds
@@ -0,0 +1,60 @@
+import time
+
+from django.db import connection
+
+from . import metrics
+
+UNRESOLVED = '<unresolved>'
+
+
+class MetricsMiddleware:
+    """
+    Время, размер ответа, SQL-запросы и рендеринг по имени маршрута.
+
+    Стоит первым в MIDDLEWARE, чтобы время ответа включало и остальные
+    промежуточные слои.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = metrics.begin(request)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            metrics.end()
+        self.record(request, response, time.perf_counter() - start, timings)
+        metrics.flush()
+        return response
+
+    @staticmethod
+    def record(request, response, seconds, timings):
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        metrics.increment(
+            'yatube_http_requests_total', view=view, method=request.method,
+            status=response.status_code,
+        )
+        metrics.observe(
+            'yatube_http_request_duration_seconds', seconds,
+            metrics.LATENCY_BUCKETS, view=view,
+        )
+        if not response.streaming:
+            metrics.observe(
+                'yatube_http_response_size_bytes', len(response.content),
+                metrics.SIZE_BUCKETS, view=view,
+            )
+        metrics.increment(
+            'yatube_db_queries_total', timings.queries, view=view
+        )
+        metrics.increment(
+            'yatube_db_query_duration_seconds_total', timings.sql_seconds,
+            view=view,
+        )
+        metrics.increment(
+            'yatube_template_render_duration_seconds_total',
+            timings.render_seconds, view=view,
+        )
@@ -0,0 +1,189 @@
+"""
+Журнал медленных SQL-запросов.
+
+При создании соединения к нему добавляется обёртка execute: запрос
+дольше SLOW_QUERY_THRESHOLD_MS миллисекунд попадает в логгер этого
+модуля вместе с представлением, строкой кода проекта, из которой он
+сделан, и планом EXPLAIN. Записей не больше SLOW_QUERY_LOG_LIMIT за
+SLOW_QUERY_LOG_PERIOD секунд на процесс; EXPLAIN выполняется только
+для записей, которые будут записаны, поэтому журнал можно не
+выключать и на боевом сервере.
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# сколько строк кода проекта попадает в запись и сколько символов
+# параметра запроса
+STACK_DEPTH = 5
+PARAM_LENGTH = 200
+EXPLAINABLE = ('SELECT', 'WITH')
+SAVEPOINT = 'slow_query_explain'
+# обёртки execute, которые не считаются источником запроса
+INTERNAL = {__file__, metrics.__file__}
+
+
+class RateLimit:
+    """
+    Не больше SLOW_QUERY_LOG_LIMIT событий за SLOW_QUERY_LOG_PERIOD
+    секунд; лишние только считаются.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window = 0.0
+        self._count = 0
+        self.suppressed = 0
+
+    def allow(self):
+        """True, если событие укладывается в предел."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window >= settings.SLOW_QUERY_LOG_PERIOD:
+                self._window, self._count = now, 0
+            if self._count >= settings.SLOW_QUERY_LOG_LIMIT:
+                self.suppressed += 1
+                return False
+            self._count += 1
+            return True
+
+    def take_suppressed(self):
+        with self._lock:
+            suppressed, self.suppressed = self.suppressed, 0
+        return suppressed
+
+
+_limit = RateLimit()
+
+
+def _project_frames():
+    """Кадры стека из кода проекта, от внутреннего к внешнему."""
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        path = os.path.relpath(frame.filename, settings.BASE_DIR)
+        if (
+            path.startswith('..') or 'site-packages' in path
+            or frame.filename in INTERNAL
+        ):
+            continue
+        frames.append(f'{path}:{frame.lineno} in {frame.name}')
+        if len(frames) == STACK_DEPTH:
+            break
+    return frames
+
+
+def explain(connection, sql, params):
+    """
+    План запроса строками; для запросов, кроме чтения, — None.
+
+    Внутри транзакции EXPLAIN выполняется в своей точке сохранения:
+    в PostgreSQL его ошибка иначе прервала бы транзакцию вызывающего
+    кода. Курсор — курсор драйвера, поэтому запросы журнала не попадают
+    в обёртки execute.
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    savepoint = (
+        connection.in_atomic_block and connection.features.uses_savepoints
+    )
+    cursor = connection.create_cursor()
+    try:
+        if savepoint:
+            cursor.execute(f'SAVEPOINT {SAVEPOINT}')
+        try:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params
+            )
+            return [
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            ]
+        except connection.Database.Error as error:
+            if savepoint:
+                cursor.execute(f'ROLLBACK TO SAVEPOINT {SAVEPOINT}')
+            return [f'EXPLAIN не выполнен: {error}']
+        finally:
+            if savepoint:
+                cursor.execute(f'RELEASE SAVEPOINT {SAVEPOINT}')
+    finally:
+        cursor.close()
+
+
+def _param(value):
+    text = repr(value)
+    return text if len(text) <= PARAM_LENGTH else (
+        text[:PARAM_LENGTH] + '…'
+    )
+
+
+def record(connection, sql, params, many, seconds):
+    request = metrics.current_request()
+    match = request.resolver_match if request is not None else None
+    frames = _project_frames()
+    logger.warning('Медленный запрос %.0f мс', seconds * 1000, extra={
+        'query': {
+            'duration_ms': round(seconds * 1000, 3),
+            'database': connection.alias,
+            'sql': sql,
+            'params': None if many or params is None else [
+                _param(value) for value in params
+            ],
+            'many': many,
+            'view': match.view_name if match else None,
+            'path': request.path if request is not None else None,
+            'frame': frames[0] if frames else None,
+            'stack': frames,
+            'explain': None if many else explain(connection, sql, params),
+            'suppressed': _limit.take_suppressed(),
+            'pid': os.getpid(),
+        },
+    })
+
+
+def log_slow(execute, sql, params, many, context):
+    """Обёртка execute: замеряет запрос и записывает медленный."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    seconds = time.perf_counter() - start
+    if seconds * 1000 >= threshold and _limit.allow():
+        record(context['connection'], sql, params, many, seconds)
+    return result
+
+
+def install(sender, connection, **kwargs):
+    """
+    Приёмник connection_created.
+
+    Соединение часто открывается внутри блока execute_wrapper, например
+    у MetricsMiddleware, а такой блок на выходе снимает последнюю обёртку
+    списка. Поэтому log_slow встаёт первой, а не последней.
+    """
+    if log_slow not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow)
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала одной строкой JSON с полями из extra['query']."""
+
+    def format(self, record):
+        return json.dumps({
+            'time': datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            **getattr(record, 'query', {}),
+        }, ensure_ascii=False, default=str)
@@ -0,0 +1,33 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    """Шаблон, время рендеринга которого попадает в метрики запроса."""
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.add_render(time.perf_counter() - start)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Движок Django, отмечающий время рендеринга шаблонов верхнего уровня.
+
+    Вложенные {% include %} и {% extends %} рендерятся внутри внешнего
+    шаблона и отдельно не считаются.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self
+        )
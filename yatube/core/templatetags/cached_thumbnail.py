@@ -0,0 +1,10 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_thumbnail(image, preset):
+    return thumbnails.thumbnail(image, preset)
@@ -0,0 +1,11 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.fragments import punch
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def fragment(context, template_name, **kwargs):
+    return mark_safe(punch(context.get('request'), template_name, kwargs))
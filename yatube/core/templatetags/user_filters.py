@@ -1,8 +1,17 @@
 from django import template
 
+from posts.models import Follow
+
 register = template.Library()
 
 
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def follows(user, username):
+    return Follow.objects.filter(
+        user=user, author__username=username
+    ).exists()
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from . import metrics
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Тесты пишут кэш и метрики во временный каталог.
+
+    Иначе cache.clear() в тестах стирал бы кэш yatube/cache запущенного
+    рядом сервера, а файлы метрик тестов попадали бы в его /metrics.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.directory = tempfile.mkdtemp(prefix='yatube-tests-')
+        self.isolated = override_settings(**isolated_settings(self.directory))
+        self.isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        metrics.close()
+        self.isolated.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+
+def isolated_settings(directory):
+    """CACHES и METRICS_DIR с файлами внутри directory."""
+    shared = dict(
+        settings.CACHES['shared'], LOCATION=os.path.join(directory, 'cache')
+    )
+    return {
+        'CACHES': dict(settings.CACHES, shared=shared),
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+    }
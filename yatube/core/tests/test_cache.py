@@ -0,0 +1,94 @@
+import multiprocessing
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import FileCache, TwoTierCache
+
+SHARED_DIR = tempfile.mkdtemp()
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': SHARED_DIR,
+    },
+}
+PARAMS = {'OPTIONS': {'MAX_ENTRIES': 2}}
+WORKERS = 8
+KEYS = 30
+
+
+def race_for_keys(start, taken):
+    """Процесс пытается взять через add все ключи и сообщает, сколько взял."""
+    shared = FileCache(SHARED_DIR, {})
+    start.wait()
+    taken.put(sum(shared.add(f'lock:{key}', 1) for key in range(KEYS)))
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SHARED_DIR, ignore_errors=True)
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.worker = TwoTierCache('shared', PARAMS)
+        self.other = TwoTierCache('shared', PARAMS)
+
+    def test_values_shared_between_processes(self):
+        """Запись одного процесса видна другому"""
+        self.worker.set('key', {'value': 1})
+        self.assertEqual(self.other.get('key'), {'value': 1})
+        self.assertEqual(self.other.get_many(['key', 'none']), {
+            'key': {'value': 1}
+        })
+
+    def test_local_copy_invalidated_by_stamp(self):
+        """Перезапись и удаление в одном процессе сбрасывают L1 другого"""
+        self.worker.set('key', 1)
+        self.assertEqual(self.other.get('key'), 1)
+        self.worker.set('key', 2)
+        self.assertEqual(self.other.get('key'), 2)
+        self.worker.delete('key')
+        self.assertIsNone(self.other.get('key'))
+
+    def test_local_copy_is_not_mutated(self):
+        """Изменение полученного объекта не портит копию в L1"""
+        self.worker.set('key', [1])
+        self.worker.get('key').append(2)
+        self.assertEqual(self.worker.get('key'), [1])
+
+    def test_local_tier_is_bounded(self):
+        """L1 хранит не больше MAX_ENTRIES записей"""
+        for key in 'abc':
+            self.worker.set(key, key)
+        self.assertEqual(len(self.worker._local), 2)
+        self.assertEqual(self.worker.get('a'), 'a')
+
+    def test_add_and_incr(self):
+        """add не перезаписывает значение, incr работает через оба уровня"""
+        self.assertTrue(self.worker.add('counter', 1))
+        self.assertFalse(self.other.add('counter', 5))
+        self.other.incr('counter')
+        self.assertEqual(self.worker.get('counter'), 2)
+
+    def test_add_is_atomic_between_processes(self):
+        """Каждый ключ через add достаётся ровно одному процессу"""
+        context = multiprocessing.get_context('fork')
+        start, taken = context.Barrier(WORKERS), context.Queue()
+        workers = [
+            context.Process(target=race_for_keys, args=(start, taken))
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        total = sum(taken.get(timeout=30) for _ in workers)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(total, KEYS)
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase
+
+from core.instrumentation import measure
+
+User = get_user_model()
+
+
+class MeasureTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(3)
+        )
+
+    def test_counts_queries_and_rows(self):
+        """Считает запросы и прочитанные строки"""
+        with measure() as measurement:
+            list(User.objects.all())
+            User.objects.filter(username='user0').exists()
+            User.objects.count()
+        self.assertEqual(measurement['queries'], 3)
+        self.assertEqual(measurement['rows'], 5)
+        self.assertGreater(measurement['wall_ms'], 0)
+
+    def test_times_outer_templates_only(self):
+        """Вложенные шаблоны не считаются дважды"""
+        template = Template('{% include inner %}')
+        with measure() as measurement:
+            template.render(Context({'inner': Template('x')}))
+        self.assertGreater(measurement['render_ms'], 0)
+        self.assertLessEqual(
+            measurement['render_ms'], measurement['wall_ms']
+        )
+
+    def test_patches_are_removed(self):
+        """После блока курсоры и шаблоны работают как обычно"""
+        with measure():
+            pass
+        with measure() as measurement:
+            pass
+        list(User.objects.all())
+        self.assertEqual(measurement['rows'], 0)
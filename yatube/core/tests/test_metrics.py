@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+TOKEN = 'metrics-token'
+METRICS_URL = reverse('metrics')
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(
+            METRICS_DIR=directory, METRICS_TOKEN=TOKEN
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics._values.clear()
+        self.addCleanup(metrics._values.clear)
+
+    def scrape(self):
+        response = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION=f'Bearer {TOKEN}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_render(self):
+        metrics.increment('yatube_page_cache_events_total', event='hit')
+        metrics.observe(
+            'yatube_http_request_duration_seconds', 0.02, (0.01, 0.05),
+            view='posts:index',
+        )
+        text = metrics.render(metrics._values)
+        self.assertIn(
+            '# TYPE yatube_http_request_duration_seconds histogram', text
+        )
+        for line in (
+            'yatube_http_request_duration_seconds_bucket'
+            '{le="0.01",view="posts:index"} 0.0',
+            'yatube_http_request_duration_seconds_bucket'
+            '{le="0.05",view="posts:index"} 1.0',
+            'yatube_http_request_duration_seconds_bucket'
+            '{le="+Inf",view="posts:index"} 1.0',
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 1.0',
+            'yatube_page_cache_events_total{event="hit"} 1.0',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+
+    def write_process(self, pid, value):
+        path = os.path.join(metrics.directory(), f'{pid}-other.json')
+        os.makedirs(metrics.directory(), exist_ok=True)
+        with open(path, 'w') as samples:
+            json.dump([[
+                'yatube_page_cache_events_total', '', [['event', 'miss']],
+                value
+            ]], samples)
+        return path
+
+    def test_processes_are_summed(self):
+        metrics.increment('yatube_page_cache_events_total', event='miss')
+        self.write_process(os.getppid(), 2)
+        self.assertIn(
+            'yatube_page_cache_events_total{event="miss"} 3.0',
+            self.scrape(),
+        )
+
+    def test_dead_processes_are_archived(self):
+        """Файл завершившегося процесса уходит в архив, сумма не меняется"""
+        worker = subprocess.Popen([sys.executable, '-c', ''])
+        worker.wait()
+        path = self.write_process(worker.pid, 2)
+        line = 'yatube_page_cache_events_total{event="miss"} 2.0'
+        self.assertIn(line, self.scrape())
+        self.assertFalse(os.path.exists(path))
+        self.assertIn(line, self.scrape())
+
+    def test_exit_moves_values_to_archive(self):
+        """При выходе процесс сдаёт итоги в архив и удаляет свой файл"""
+        metrics.increment('yatube_page_cache_events_total', event='miss')
+        metrics.flush(force=True)
+        own = os.listdir(metrics.directory())
+        metrics.close()
+        self.assertEqual(
+            set(os.listdir(metrics.directory())) & set(own), set()
+        )
+        self.assertEqual(metrics.collect(), {
+            ('yatube_page_cache_events_total', '', (('event', 'miss'),)): 1
+        })
+
+    def test_request_is_measured(self):
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        for line in (
+            'yatube_http_requests_total'
+            '{method="GET",status="200",view="posts:index"} 1.0',
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 1.0',
+            'yatube_http_response_size_bytes_count{view="posts:index"} 1.0',
+            'yatube_page_cache_events_total{event="miss"} 1.0',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+        for name in (
+            'yatube_db_queries_total',
+            'yatube_db_query_duration_seconds_total',
+            'yatube_template_render_duration_seconds_total',
+        ):
+            with self.subTest(name=name):
+                value = next(
+                    line for line in text.splitlines()
+                    if line.startswith(f'{name}{{view="posts:index"}}')
+                ).split()[-1]
+                self.assertGreater(float(value), 0)
+        self.assertIn('yatube_cache_lookups_total{result="hit"', text)
+
+    def test_endpoint_is_protected(self):
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(METRICS_URL, **headers)
+                self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 401)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 200)
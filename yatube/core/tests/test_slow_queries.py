@@ -0,0 +1,107 @@
+import json
+import logging
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import slow_queries
+from posts.models import Group, Post, User
+
+LOGGER = 'core.slow_queries'
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        slow_queries._limit = slow_queries.RateLimit()
+        # медленным считается любой запрос, поэтому тесты обращаются
+        # к базе только внутри assertLogs: иначе записи ушли бы в журнал
+        settings = override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_LIMIT=1000,
+            SLOW_QUERY_LOG_PERIOD=60,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_entry_has_view_frame_and_plan(self):
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        entries = [
+            record.query for record in logs.records
+            if 'posts_post' in record.query['sql']
+        ]
+        self.assertTrue(entries)
+        entry = entries[0]
+        self.assertEqual(entry['view'], 'posts:index')
+        self.assertEqual(entry['path'], reverse('posts:index'))
+        self.assertTrue(entry['frame'].startswith('posts/'))
+        self.assertTrue(entry['explain'])
+        self.assertFalse(
+            any('не выполнен' in row for row in entry['explain'])
+        )
+
+    def test_writes_are_not_explained(self):
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            Group.objects.create(title='Группа', slug='group')
+        insert, = [
+            record.query for record in logs.records
+            if record.query['sql'].startswith('INSERT')
+        ]
+        self.assertIsNone(insert['explain'])
+        self.assertIsNone(insert['view'])
+        self.assertTrue(insert['frame'].startswith('core/tests/'))
+
+    def test_failed_explain_keeps_transaction(self):
+        """Ошибка EXPLAIN записывается в журнал и не ломает транзакцию"""
+        with transaction.atomic():
+            plan = slow_queries.explain(connection, 'SELECT * FROM none', [])
+            self.assertIn('не выполнен', plan[0])
+            with self.assertLogs(LOGGER, 'WARNING'):
+                self.assertEqual(User.objects.count(), 1)
+
+    def test_installed_outside_request_wrappers(self):
+        """Соединение, открытое в execute_wrapper, не оставляет обёрток"""
+        connection.execute_wrappers.remove(slow_queries.log_slow)
+
+        def timings(execute, *args):
+            return execute(*args)
+
+        with connection.execute_wrapper(timings):
+            slow_queries.install(None, connection)
+        self.assertEqual(connection.execute_wrappers, [slow_queries.log_slow])
+
+    def test_rate_limit(self):
+        with override_settings(SLOW_QUERY_LOG_LIMIT=2):
+            with self.assertLogs(LOGGER, 'WARNING') as logs:
+                for _ in range(5):
+                    User.objects.count()
+            self.assertEqual(len(logs.records), 2)
+            with override_settings(SLOW_QUERY_LOG_PERIOD=0):
+                with self.assertLogs(LOGGER, 'WARNING') as logs:
+                    User.objects.count()
+        self.assertEqual(logs.records[0].query['suppressed'], 3)
+
+    def test_disabled(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=None):
+            with self.assertNoLogs(LOGGER):
+                User.objects.count()
+
+    def test_json_formatter(self):
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            User.objects.count()
+        line = slow_queries.JsonFormatter().format(logs.records[0])
+        entry = json.loads(line)
+        self.assertEqual(entry['level'], logging.getLevelName(
+            logging.WARNING
+        ))
+        self.assertIn('duration_ms', entry)
+        self.assertIn('auth_user', entry['sql'])
+        self.assertNotIn('\n', line)
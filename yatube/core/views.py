@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+from . import metrics as registry
 
 
 def page_not_found(request, exception):
@@ -15,3 +21,26 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    """Токен из METRICS_TOKEN в заголовке Authorization или сотрудник."""
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(
+        ' '
+    )
+    if settings.METRICS_TOKEN and scheme.lower() == 'bearer':
+        return constant_time_compare(token, settings.METRICS_TOKEN)
+    return request.user.is_active and request.user.is_staff
+
+
+@require_safe
+def metrics(request):
+    if not metrics_allowed(request):
+        response = HttpResponse('Требуется авторизация\n', status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    registry.flush(force=True)
+    return HttpResponse(
+        registry.render(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
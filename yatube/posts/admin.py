@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Follow, Post, Group
 
 admin.site.register(Group)
@@ -43,5 +44,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу, как и поиск на сайте."""
+        if not search_term.strip():
+            return queryset, False
+        found = search.search(Post.objects.all(), search_term)
+        return queryset.filter(pk__in=found.values('pk')), False
+
 
 admin.site.register(Post, PostAdmin)
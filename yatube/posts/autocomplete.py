@@ -0,0 +1,243 @@
+"""
+Подсказки авторов и групп по началу имени.
+
+Каждый процесс держит в памяти отсортированный список ключей. Изменения
+пользователей и групп применяются к нему на месте и записываются в общий
+журнал в кэше; остальные процессы читают журнал и применяют те же
+изменения, не перечитывая базу. Заново индекс загружается, только если
+журнал не помогает: кэш очищен или нужная запись из него пропала.
+"""
+import bisect
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Group, User
+
+USER = 'user'
+GROUP = 'group'
+HEAD_KEY = 'autocomplete:head'
+CHANGE_KEY = 'autocomplete:change:{}:{}'
+# сколько хранится запись журнала; процесс, отставший сильнее, загружает
+# индекс заново
+CHANGE_TTL = 60 * 60
+
+
+def _keys(*texts):
+    """Строка целиком и её хвосты с начала каждого слова, в нижнем регистре."""
+    keys = set()
+    for text in texts:
+        words = text.lower().split()
+        keys.update(' '.join(words[i:]) for i in range(len(words)))
+    return keys
+
+
+def _entries(kind, pk, value, label, *texts):
+    return sorted(
+        (key, kind, pk, value, label) for key in _keys(value, *texts)
+    )
+
+
+def user_entries(pk, username, first_name, last_name):
+    full_name = f'{first_name} {last_name}'.strip()
+    return _entries(USER, pk, username, full_name or username, full_name)
+
+
+def group_entries(pk, slug, title):
+    return _entries(GROUP, pk, slug, title, title)
+
+
+def head():
+    """
+    Эпоха и номер последнего изменения в общем журнале.
+
+    Эпоха заводится заново, если ключа нет, например после очистки кэша:
+    номера прежней эпохи тогда ничего не значат.
+    """
+    found = cache.get(HEAD_KEY)
+    if found is None:
+        cache.add(HEAD_KEY, (uuid.uuid4().hex, 0), None)
+        found = cache.get(HEAD_KEY)
+    return found
+
+
+def publish(kind, pk, entries):
+    """
+    Записывает изменение объекта в общий журнал.
+
+    Номер занимается атомарным add, поэтому одновременные изменения из
+    разных процессов получают разные номера и идут в журнале подряд.
+    """
+    epoch, number = head()
+    number += 1
+    while not cache.add(
+        CHANGE_KEY.format(epoch, number), (kind, pk, entries), CHANGE_TTL
+    ):
+        number += 1
+    cache.set(HEAD_KEY, (epoch, number), None)
+
+
+class Index:
+    """Индекс процесса: записи, отсортированные по ключу."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        self._entries = []
+        self._owned = {}
+        self._epoch = None
+        self._applied = 0
+        self._checked = 0.0
+
+    def _replace(self, kind, pk, entries):
+        """Заменяет записи объекта; entries=None удаляет их."""
+        for entry in self._owned.pop((kind, pk), []):
+            position = bisect.bisect_left(self._entries, entry)
+            if (
+                position < len(self._entries)
+                and self._entries[position] == entry
+            ):
+                del self._entries[position]
+        if entries:
+            self._owned[kind, pk] = entries
+            for entry in entries:
+                bisect.insort(self._entries, entry)
+
+    def _load(self):
+        """
+        Строит индекс заново и подменяет им прежний.
+
+        Записи собираются и сортируются без блокировки, подсказки в это
+        время отдаются из прежнего индекса. Номер журнала берётся до
+        чтения базы: изменения, сделанные во время загрузки, применятся
+        потом ещё раз, а это безопасно.
+        """
+        epoch, applied = head()
+        owned = {}
+        for pk, *fields in User.objects.filter(is_active=True).values_list(
+            'pk', 'username', 'first_name', 'last_name'
+        ).iterator():
+            owned[USER, pk] = user_entries(pk, *fields)
+        for pk, *fields in Group.objects.values_list(
+            'pk', 'slug', 'title'
+        ).iterator():
+            owned[GROUP, pk] = group_entries(pk, *fields)
+        entries = sorted(
+            entry for items in owned.values() for entry in items
+        )
+        with self._lock:
+            self._entries, self._owned = entries, owned
+            self._epoch, self._applied = epoch, applied
+
+    def _reload(self):
+        # ждать чужой загрузки приходится только самой первой: потом
+        # подсказки идут из прежнего индекса
+        loaded = self._epoch is not None
+        if not self._loading.acquire(blocking=not loaded):
+            return
+        try:
+            if loaded or self._epoch is None:
+                self._load()
+        finally:
+            self._loading.release()
+
+    def _catch_up(self):
+        """
+        Применяет новые изменения из общего журнала.
+
+        False, если журнал не помогает: сменилась эпоха или нужная
+        запись пропала.
+        """
+        while True:
+            key = CHANGE_KEY.format(self._epoch, self._applied + 1)
+            found = cache.get_many([HEAD_KEY, key])
+            epoch, number = found.get(HEAD_KEY, (None, 0))
+            if epoch != self._epoch:
+                return False
+            if key not in found:
+                return number <= self._applied
+            self._replace(*found[key])
+            self._applied += 1
+
+    def ensure_current(self):
+        """
+        Загружает индекс при первом обращении и догоняет журнал.
+
+        Журнал проверяется не чаще раза в AUTOCOMPLETE_CHECK_INTERVAL
+        секунд.
+        """
+        now = time.monotonic()
+        if (
+            self._epoch is not None
+            and now - self._checked < settings.AUTOCOMPLETE_CHECK_INTERVAL
+        ):
+            return
+        with self._lock:
+            current = self._epoch is not None and self._catch_up()
+        if not current:
+            self._reload()
+        self._checked = now
+
+    def update(self, kind, pk, entries=None):
+        """Меняет индекс на месте и сообщает остальным процессам."""
+        publish(kind, pk, entries)
+        with self._lock:
+            if self._epoch is not None:
+                self._replace(kind, pk, entries)
+
+    def complete(self, prefix, limit):
+        self.ensure_current()
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (prefix,))
+            found, seen = [], set()
+            while position < len(self._entries) and len(found) < limit:
+                key, kind, pk, value, label = self._entries[position]
+                if not key.startswith(prefix):
+                    break
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    found.append((kind, value, label))
+                position += 1
+        return found
+
+
+_index = Index()
+
+
+def update_user(user):
+    if user.is_active:
+        _index.update(USER, user.pk, user_entries(
+            user.pk, user.username, user.first_name, user.last_name
+        ))
+    else:
+        _index.update(USER, user.pk)
+
+
+def remove_user(user):
+    _index.update(USER, user.pk)
+
+
+def update_group(group):
+    _index.update(GROUP, group.pk, group_entries(
+        group.pk, group.slug, group.title
+    ))
+
+
+def remove_group(group):
+    _index.update(GROUP, group.pk)
+
+
+def complete(prefix, limit=None):
+    """
+    Первые limit авторов и групп, имя, слаг или название которых
+    (или слово в нём) начинается с prefix.
+
+    Возвращает кортежи (вид, значение, подпись).
+    """
+    prefix = ' '.join(prefix.lower().split())
+    if not prefix:
+        return []
+    return _index.complete(prefix, limit or settings.AUTOCOMPLETE_LIMIT)
@@ -0,0 +1,237 @@
+import hashlib
+import math
+import random
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core import metrics
+from core.fragments import stitch
+
+from .models import Follow
+
+GENERATION_KEY = 'generation:{}'
+PAGE_KEY = 'page:{}:{}'
+LOCK_KEY = 'lock:{}'
+COUNTER_METRIC = 'yatube_page_cache_events_total'
+EVENTS = ('hit', 'miss', 'stale', 'lock_wait')
+LOCK_TIMEOUT = 10
+LOCK_POLL = 0.05
+BETA = 1.0
+
+
+def _token():
+    return format(time.time_ns(), 'x')
+
+
+def bump(*namespaces):
+    """Сбрасывает кэш страниц, зависящих от данных пространств имён."""
+    token = _token()
+    cache.set_many(
+        {GENERATION_KEY.format(namespace): token for namespace in namespaces},
+        None
+    )
+
+
+def generations(namespaces):
+    """Текущие поколения пространств имён; пропавшие заводятся заново."""
+    keys = [GENERATION_KEY.format(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _token(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def count(event):
+    """
+    Отмечает событие кэша страниц в метриках процесса.
+
+    Счётчики живут в памяти: запись в общий кэш на каждом попадании
+    стоила бы обращения к диску, а incr в файловом кэше не атомарен.
+    Сумму по процессам отдаёт /metrics.
+    """
+    metrics.increment(COUNTER_METRIC, event=event)
+
+
+def counters():
+    """Попадания, промахи, устаревшие ответы и ожидания в этом процессе."""
+    return {
+        event: metrics.value(COUNTER_METRIC, event=event) for event in EVENTS
+    }
+
+
+def fresh(envelope, generation):
+    """
+    Запись актуальна, если поколения совпадают и срок не подошёл.
+
+    Срок сдвигается на случайную величину, пропорциональную времени
+    пересчёта (XFetch), поэтому дорогие записи обновляет один запрос
+    заранее, а не все одновременно в момент истечения.
+    """
+    if envelope['generation'] != generation:
+        return False
+    early = envelope['delta'] * BETA * math.log(1 - random.random())
+    return time.time() - early < envelope['expires']
+
+
+def fetch(key, generation, compute, cacheable=lambda value: True):
+    """
+    Возвращает значение из кэша, пересчитывая его не более одного раза.
+
+    Пересчитывает только запрос, взявший блокировку; остальные в это время
+    получают прежнее значение, а если его нет — ждут результата.
+    """
+    envelope = cache.get(key)
+    if envelope and fresh(envelope, generation):
+        count('hit')
+        return envelope['value']
+    lock = LOCK_KEY.format(key)
+    locked = cache.add(lock, 1, LOCK_TIMEOUT)
+    if not locked and envelope:
+        count('stale')
+        return envelope['value']
+    if not locked:
+        count('lock_wait')
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline and lock in cache:
+            time.sleep(LOCK_POLL)
+            envelope = cache.get(key)
+            if envelope and envelope['generation'] == generation:
+                return envelope['value']
+    count('miss')
+    try:
+        start = time.monotonic()
+        value = compute()
+        if cacheable(value):
+            cache.set(key, {
+                'generation': generation,
+                'expires': time.time() + settings.PAGE_CACHE_TTL,
+                'delta': time.monotonic() - start,
+                'value': value,
+            }, None)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return value
+
+
+def page_key(request, shared=False):
+    variant = ':'.join([
+        request.get_full_path(),
+        '' if shared else str(request.user.pk),
+    ])
+    return PAGE_KEY.format(
+        request.resolver_match.view_name,
+        hashlib.md5(variant.encode()).hexdigest()
+    )
+
+
+def cached_page(*namespaces, shared=False):
+    """
+    Кэширует страницу до изменения её данных или PAGE_CACHE_TTL секунд.
+
+    Пространства имён — шаблоны с аргументами view и id пользователя,
+    например 'group:{slug}' или 'follow:{user}'. Сигналы моделей вызывают
+    bump() для затронутых пространств, и запись страницы устаревает.
+
+    С shared=True хранится один вариант страницы на всех пользователей:
+    фрагменты из тега {% fragment %} остаются в нём метками и рендерятся
+    для каждого запроса заново.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            def render():
+                request.page_cache_holes = [] if shared else None
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    holes, request.page_cache_holes = (
+                        request.page_cache_holes, None
+                    )
+                return response, holes
+
+            response, holes = fetch(
+                page_key(request, shared),
+                generations([
+                    namespace.format(user=request.user.pk, **kwargs)
+                    for namespace in namespaces
+                ]),
+                render,
+                lambda entry: (
+                    entry[0].status_code == 200 and not entry[0].streaming
+                ),
+            )
+            if holes:
+                response = stitch(request, response, holes)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(*namespaces):
+    """
+    Отвечает 304 на If-None-Match и If-Modified-Since до вызова view.
+
+    ETag складывается из поколений пространств имён и id пользователя,
+    Last-Modified — время последнего bump() среди них; его получают только
+    анонимы, чья страница не зависит от сессии. Кроме шаблонов, как у
+    cached_page, пространством может быть функция от аргументов view,
+    возвращающая список пространств.
+    """
+    def tokens(request, kwargs):
+        if not hasattr(request, 'page_generations'):
+            names = []
+            for namespace in namespaces:
+                if callable(namespace):
+                    names += namespace(**kwargs)
+                else:
+                    names.append(
+                        namespace.format(user=request.user.pk, **kwargs)
+                    )
+            request.page_generations = generations(names)
+        return request.page_generations
+
+    def etag(request, *args, **kwargs):
+        return hashlib.md5(':'.join(
+            [str(request.user.pk), *tokens(request, kwargs)]
+        ).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        newest = max(int(token, 16) for token in tokens(request, kwargs))
+        return datetime.fromtimestamp(newest / 1e9, timezone.utc)
+
+    return condition(etag, last_modified)
+
+
+def post_namespaces(post, group_slugs=(), feeds=True):
+    """
+    Пространства имён страниц, на которых виден пост.
+
+    С feeds=False ленты подписчиков не сбрасываются: у популярного автора
+    это тысячи ключей. Так делают комментарии — лента зависит только от
+    своих записей FeedEntry, и счётчик комментариев в ней обновится
+    через PAGE_CACHE_TTL.
+    """
+    namespaces = [
+        'index', f'post:{post.pk}', f'profile:{post.author.username}'
+    ]
+    namespaces += [f'group:{slug}' for slug in group_slugs if slug]
+    if feeds:
+        namespaces += [
+            f'follow:{user_id}' for user_id in Follow.objects.filter(
+                author_id=post.author_id
+            ).values_list('user_id', flat=True)
+        ]
+    return namespaces
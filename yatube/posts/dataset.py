@@ -0,0 +1,133 @@
+"""
+Выгрузка и загрузка данных сайта построчным JSON (NDJSON).
+
+Каждая строка — {"model": "posts.post", "fields": {...}}. Модели идут
+в порядке внешних ключей, поэтому файл читается и пишется потоком,
+без загрузки целиком в память. Производные данные (ленты, статистика,
+счётчики, поисковый индекс) не выгружаются и пересчитываются после
+загрузки.
+"""
+import datetime
+import json
+import time
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .models import Comment, Follow, Group, Post, User
+
+MODELS = (User, Group, Post, Comment, Follow)
+DERIVED_FIELDS = {Post: {'comment_count'}}
+
+
+class Encoder(DjangoJSONEncoder):
+    """Даты с микросекундами: DjangoJSONEncoder обрезает их до миллисекунд."""
+
+    def default(self, value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        return super().default(value)
+
+
+def _fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name not in DERIVED_FIELDS.get(model, ())
+    ]
+
+
+def dump(chunk_size=1000):
+    """Строки NDJSON со всеми объектами; читает таблицы порциями."""
+    for model in MODELS:
+        label = model._meta.label_lower
+        names = [field.attname for field in _fields(model)]
+        rows = model.objects.order_by('pk').values(*names).iterator(
+            chunk_size=chunk_size
+        )
+        for row in rows:
+            yield json.dumps(
+                {'model': label, 'fields': row},
+                cls=Encoder, ensure_ascii=False,
+            )
+
+
+@contextmanager
+def explicit_dates(model):
+    """
+    Отключает auto_now_add/auto_now, чтобы сохранить даты из файла.
+
+    bulk_create иначе заменил бы их текущим временем.
+    """
+    fields = [
+        field for field in _fields(model)
+        if getattr(field, 'auto_now_add', False)
+        or getattr(field, 'auto_now', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _instance(model, fields, values):
+    return model(**{
+        field.attname: field.to_python(values[field.attname])
+        for field in fields if field.attname in values
+    })
+
+
+def load(lines, batch_size=1000, progress=None):
+    """
+    Загружает объекты из строк NDJSON пачками через bulk_create.
+
+    Каждая пачка пишется в своей транзакции. progress(label, loaded,
+    seconds) вызывается после каждой пачки. Возвращает число объектов
+    по моделям.
+    """
+    models = {model._meta.label_lower: model for model in MODELS}
+    loaded = dict.fromkeys(models, 0)
+    start = time.monotonic()
+    batch, model = [], None
+
+    def flush():
+        if not batch:
+            return
+        with explicit_dates(model), transaction.atomic():
+            model.objects.bulk_create(batch)
+        label = model._meta.label_lower
+        loaded[label] += len(batch)
+        batch.clear()
+        if progress is not None:
+            progress(label, loaded[label], time.monotonic() - start)
+
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get('model') not in models:
+            raise ValueError(f'Неизвестная модель: {record.get("model")}')
+        if models[record['model']] is not model:
+            flush()
+            model = models[record['model']]
+            fields = _fields(model)
+        batch.append(_instance(model, fields, record['fields']))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    reset_sequences()
+    return loaded
+
+
+def reset_sequences():
+    """Сдвигает автоинкременты за загруженные id (нужно PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), MODELS)
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
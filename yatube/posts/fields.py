@@ -0,0 +1,23 @@
+from django.db import models
+from django.db.models import Lookup
+
+
+class SearchBodyField(models.TextField):
+    """Колонка полнотекстового индекса: FTS5 в SQLite, tsvector в Postgres."""
+
+
+@SearchBodyField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (
+            f"{lhs} @@ to_tsquery('simple', {rhs})", lhs_params + rhs_params
+        )
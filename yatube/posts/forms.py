@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import images
 from .models import Post, Comment
 
 
@@ -19,6 +21,12 @@ class PostForm(ModelForm):
             'image': 'Выберите картинку',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return images.ingest(image)
+        return image
+
 
 class CommentForm(ModelForm):
 
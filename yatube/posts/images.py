@@ -0,0 +1,127 @@
+import io
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+VARIANT_NAME = 'posts/variants/{}-{}.{}'
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 6},
+}
+# во что пересохраняются форматы, которые Pillow умеет только читать
+FALLBACK_FORMAT = 'PNG'
+FALLBACK_MODES = ('1', 'L', 'LA', 'I', 'P', 'RGB', 'RGBA')
+
+
+def variant_formats():
+    """Форматы вариантов: WebP, если Pillow собран с ним, и всегда JPEG."""
+    return [
+        format for format in ('webp', 'jpeg')
+        if format != 'webp' or features.check('webp')
+    ]
+
+
+def ingest(uploaded):
+    """
+    Готовит загруженную картинку к хранению.
+
+    Поворачивает по EXIF, уменьшает до IMAGE_MAX_SIZE по большей стороне
+    и пересохраняет в исходном формате без метаданных. Форматы, которые
+    Pillow не умеет записывать (например, XPM), сохраняются в PNG с
+    соответствующим расширением. Результат пишется во временный файл на
+    диске, а не в память. Анимацию пересохранение потеряло бы, поэтому
+    анимированные картинки остаются как есть.
+    """
+    image = Image.open(uploaded)
+    if getattr(image, 'is_animated', False):
+        uploaded.seek(0)
+        return uploaded
+    format, limit = image.format, settings.IMAGE_MAX_SIZE
+    name = os.path.basename(uploaded.name)
+    image.draft(image.mode, (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    Image.init()
+    if format not in Image.SAVE:
+        format = FALLBACK_FORMAT
+        name = f'{os.path.splitext(name)[0]}.{format.lower()}'
+        if image.mode not in FALLBACK_MODES:
+            image = image.convert('RGBA')
+    output = tempfile.TemporaryFile()
+    image.save(output, format=format, **SAVE_OPTIONS.get(format, {}))
+    output.seek(0)
+    return File(output, name=name)
+
+
+def make_variants(image, geometry):
+    """
+    Сохраняет варианты картинки для srcset и возвращает их описание.
+
+    Варианты обрезаются по пропорциям geometry (как миниатюра карточки)
+    до ширин из IMAGE_VARIANT_WIDTHS, не больших ширины оригинала.
+    """
+    width, height = map(int, geometry.split('x'))
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    variants = []
+    with image.open('rb'), Image.open(image) as source:
+        source = ImageOps.exif_transpose(source).convert('RGB')
+        for size in settings.IMAGE_VARIANT_WIDTHS:
+            if size > source.width:
+                continue
+            resized = ImageOps.fit(
+                source, (size, max(1, round(size * height / width))),
+                Image.LANCZOS
+            )
+            for format in variant_formats():
+                buffer = io.BytesIO()
+                resized.save(
+                    buffer, format=format,
+                    **SAVE_OPTIONS.get(format.upper(), {})
+                )
+                name = image.storage.save(
+                    VARIANT_NAME.format(stem, size, format),
+                    ContentFile(buffer.getvalue())
+                )
+                variants.append(
+                    {'format': format, 'width': size, 'name': name}
+                )
+    return json.dumps({'source': image.name, 'variants': variants})
+
+
+def _load(image_variants):
+    try:
+        data = json.loads(image_variants)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def variant_names(image_variants):
+    """Имена файлов всех вариантов."""
+    return [
+        variant['name']
+        for variant in _load(image_variants).get('variants', [])
+    ]
+
+
+def is_current(image, image_variants):
+    """Варианты сделаны из текущей картинки поста."""
+    return bool(image) and _load(image_variants).get('source') == image.name
+
+
+def srcsets(image, image_variants):
+    """Пары (формат, srcset) вариантов, сделанных из текущей картинки."""
+    if not is_current(image, image_variants):
+        return []
+    found = {}
+    for variant in _load(image_variants)['variants']:
+        found.setdefault(variant['format'], []).append(
+            f"{image.storage.url(variant['name'])} {variant['width']}w"
+        )
+    return [(format, ', '.join(items)) for format, items in found.items()]
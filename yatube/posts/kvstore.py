@@ -0,0 +1,45 @@
+import threading
+
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """
+    Хранилище метаданных sorl с пакетной предзагрузкой.
+
+    prefetch() читает записи целой страницы одним get_many из кэша и одним
+    запросом к базе для промахов; последующие get() по этим ключам берут
+    значения из памяти потока и не обращаются ни к кэшу, ни к базе.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._prefetched = threading.local()
+
+    def prefetch(self, image_files):
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            rows = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            values = {
+                key: rows.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(values, settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(values)
+        self._prefetched.values = found
+
+    def _get_raw(self, key):
+        values = getattr(self._prefetched, 'values', {})
+        if key not in values:
+            return super()._get_raw(key)
+        value = values.pop(key)
+        if value == cached_db_kvstore.EMPTY_VALUE:
+            return None
+        return value
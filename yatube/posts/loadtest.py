@@ -0,0 +1,280 @@
+"""
+Нагрузочный прогон сайта по HTTP.
+
+Клиенты — потоки со своими requests.Session — выбирают сценарии
+по весам смеси и ходят на сервер, запущенный в этом же процессе
+(ThreadedWSGIServer с yatube.wsgi.application, при желании ещё
+в нескольких дочерних процессах на том же сокете), или на внешний
+адрес. Задержки и ошибки собираются по маршрутам.
+"""
+import os
+import random
+import re
+import signal
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler
+)
+from django.db import connections
+
+DEFAULT_MIX = {
+    'browse': 60,
+    'feed': 20,
+    'comment': 10,
+    'post': 5,
+    'follow': 5,
+}
+# сценарии, которым не нужен вход
+ANONYMOUS = {'browse'}
+PERCENTILES = (50, 95, 99)
+# первые страницы ленты читают чаще дальних
+PAGE_WEIGHTS = (8, 4, 2, 1, 1)
+# ссылка «Следующая» постраничного вывода по курсору
+NEXT_PAGE = re.compile(r'href="\?after=([\w-]+)"')
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def parse_mix(text):
+    """Смесь вида 'browse=60,feed=20' в словарь весов."""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in DEFAULT_MIX:
+            raise LoadTestError(f'Неизвестный сценарий: {name}')
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise LoadTestError(f'Вес сценария {name} должен быть числом')
+        if mix[name] < 0:
+            raise LoadTestError(f'Вес сценария {name} отрицательный')
+    if not any(mix.values()):
+        raise LoadTestError('В смеси нет сценариев с ненулевым весом')
+    return mix
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return 0.0
+    index = max(0, -(-rank * len(values) // 100) - 1)
+    return values[index]
+
+
+class Stats:
+    """Задержки и ошибки по маршрутам, общие для всех клиентов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._errors = {}
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self._timings.setdefault(route, []).append(seconds)
+            self._errors[route] = self._errors.get(route, 0) + (not ok)
+
+    def summary(self, elapsed):
+        """
+        Сводка по маршрутам и итог под ключом 'total'.
+
+        Для каждого: requests, errors, error_rate, rps и p50/p95/p99
+        в миллисекундах.
+        """
+        with self._lock:
+            timings = {
+                route: sorted(values)
+                for route, values in self._timings.items()
+            }
+            errors = dict(self._errors)
+        timings['total'] = sorted(
+            value for values in timings.values() for value in values
+        )
+        errors['total'] = sum(errors.values())
+        return {
+            route: self._route(values, errors[route], elapsed)
+            for route, values in sorted(timings.items())
+        }
+
+    @staticmethod
+    def _route(values, errors, elapsed):
+        route = {
+            'requests': len(values),
+            'errors': errors,
+            'error_rate': errors / len(values) if values else 0.0,
+            'rps': len(values) / elapsed if elapsed else 0.0,
+        }
+        for rank in PERCENTILES:
+            route[f'p{rank}'] = percentile(values, rank) * 1000
+        return route
+
+
+class Client:
+    """Один пользователь: сессия, куки и выбранные сценарии."""
+
+    def __init__(self, base_url, stats, targets, rng):
+        self.base_url = base_url
+        self.stats = stats
+        self.targets = targets
+        self.rng = rng
+        self.session = requests.Session()
+
+    def request(self, route, method, path, **kwargs):
+        token = self.session.cookies.get('csrftoken')
+        if method == 'POST' and token:
+            kwargs.setdefault('headers', {})['X-CSRFToken'] = token
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, urljoin(self.base_url, path),
+                allow_redirects=False, **kwargs
+            )
+        except requests.RequestException:
+            self.stats.record(route, time.perf_counter() - start, False)
+            return None
+        self.stats.record(
+            route, time.perf_counter() - start, response.status_code < 400
+        )
+        return response
+
+    def login(self, username, password):
+        """Вход через форму; в статистику не попадает."""
+        url = urljoin(self.base_url, '/auth/login/')
+        self.session.get(url)
+        response = self.session.post(url, allow_redirects=False, data={
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': self.session.cookies.get('csrftoken'),
+        })
+        if response.status_code != 302:
+            raise LoadTestError(f'Не удалось войти как {username}')
+
+    def post_id(self):
+        return self.rng.choice(self.targets['posts'])
+
+    def browse(self):
+        """
+        Листает главную, как читатель: с первой страницы по ссылкам
+        «Следующая», то есть по курсорам ?after=.
+        """
+        pages = self.rng.choices(
+            range(1, len(PAGE_WEIGHTS) + 1), PAGE_WEIGHTS
+        )[0]
+        path = '/'
+        for _ in range(pages):
+            response = self.request('index', 'GET', path)
+            found = response is not None and NEXT_PAGE.search(response.text)
+            if not found:
+                break
+            path = f'/?after={found.group(1)}'
+        self.request('post_detail', 'GET', f'/posts/{self.post_id()}/')
+
+    def feed(self):
+        self.request('follow_index', 'GET', '/follow/')
+
+    def comment(self):
+        self.request(
+            'add_comment', 'POST', f'/posts/{self.post_id()}/comment/',
+            data={'text': f'Комментарий {self.rng.randrange(10 ** 6)}'},
+        )
+
+    def post(self):
+        self.request('post_create', 'POST', '/create/', data={
+            'text': f'Пост под нагрузкой {self.rng.randrange(10 ** 6)}',
+        })
+
+    def follow(self):
+        username = self.rng.choice(self.targets['authors'])
+        self.request(
+            'profile_follow', 'GET', f'/profile/{username}/follow/'
+        )
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(processes=1):
+    """
+    Запускает сайт на свободном порту 127.0.0.1 в фоновом потоке.
+
+    При processes > 1 сокет дополнительно слушают processes - 1
+    дочерних процесса (fork, только Unix). Возвращает адрес сайта
+    и функцию остановки.
+    """
+    from yatube.wsgi import application
+
+    server = ThreadedWSGIServer(
+        ('127.0.0.1', 0), QuietHandler, allow_reuse_address=False
+    )
+    server.set_app(application)
+    # дочерние процессы не должны делить соединения с родителем
+    connections.close_all()
+    children = []
+    for _ in range(processes - 1):
+        pid = os.fork()
+        if not pid:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    host, port = server.server_address[:2]
+    return f'http://{host}:{port}/', stop
+
+
+def run(base_url, mix, clients, duration, targets, credentials, seed):
+    """
+    Гоняет clients клиентов duration секунд.
+
+    credentials — пары (username, password) для клиентов, которым нужен
+    вход; без них допустимы только анонимные сценарии. Возвращает
+    сводку Stats.summary.
+    """
+    stats = Stats()
+    names = [name for name, weight in mix.items() if weight]
+    weights = [mix[name] for name in names]
+    needs_login = not set(names) <= ANONYMOUS
+    if needs_login and not credentials:
+        raise LoadTestError('Для сценариев с входом нет пользователей')
+    workers = []
+    for number in range(clients):
+        client = Client(
+            base_url, stats, targets, random.Random(f'{seed}:{number}')
+        )
+        if needs_login:
+            client.login(*credentials[number % len(credentials)])
+        workers.append(client)
+    deadline = time.monotonic() + duration
+
+    def work(client):
+        while time.monotonic() < deadline:
+            getattr(client, client.rng.choices(names, weights)[0])()
+
+    threads = [
+        threading.Thread(target=work, args=(client,)) for client in workers
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.summary(time.monotonic() - start)
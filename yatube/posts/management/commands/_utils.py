@@ -0,0 +1,23 @@
+from django.core.cache import cache
+from django.core.management import call_command
+
+from posts import media
+
+DERIVED_COMMANDS = (
+    'backfill_comment_count',
+    'reconcile_stats',
+    'rebuild_timelines',
+    'rebuild_search_index',
+)
+
+
+def rebuild_derived(stdout):
+    """
+    Пересчитывает данные, которые сигналы ведут при обычном сохранении.
+
+    Нужен после bulk_create, который сигналов не посылает.
+    """
+    for command in DERIVED_COMMANDS:
+        call_command(command, stdout=stdout)
+    media.recount()
+    cache.clear()
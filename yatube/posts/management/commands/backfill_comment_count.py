@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает Post.comment_count порциями по диапазонам id.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько id постов обновлять одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        updated = 0
+        for start in range(0, last_pk + 1, chunk_size):
+            updated += stats.recount_comments(
+                Post.objects.filter(pk__gt=start, pk__lte=start + chunk_size)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено постов: {updated}')
+        )
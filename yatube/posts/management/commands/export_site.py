@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в NDJSON. Файлы картинок не выгружаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        to_stdout = options['output'] == '-'
+        stream = self.stdout if to_stdout else open(
+            options['output'], 'w', encoding='utf-8'
+        )
+        written = 0
+        try:
+            for line in dataset.dump(options['chunk_size']):
+                stream.write(line + '\n')
+                written += 1
+        finally:
+            if not to_stdout:
+                stream.close()
+        report = self.stderr if to_stdout else self.stdout
+        report.write(f'Выгружено объектов: {written}')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни один пост.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=60 * 60,
+            help='Сколько секунд файл без ссылок хранится перед удалением.',
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Сначала пересчитать ссылки по всем постам.',
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            media.recount()
+        deleted = media.collect(options['grace'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
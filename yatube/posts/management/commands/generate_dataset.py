@@ -0,0 +1,225 @@
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX, make_password
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from posts import dataset, synthetic
+from posts.models import Comment, Follow, Group, Post, User
+
+from ._utils import rebuild_derived
+
+
+class SerialPool:
+    """Пул из одного текущего процесса, чтобы не плодить процессы зря."""
+
+    def __init__(self, initializer, initargs):
+        initializer(*initargs)
+
+    def submit(self, function, *args):
+        return Done(function(*args))
+
+    def shutdown(self):
+        pass
+
+
+class Done:
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def next_pk(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей, группы, посты, комментарии '
+        'и подписки со степенным графом подписок. Строки генерируют '
+        'процессы пула, вставляет их bulk_create текущий процесс. '
+        'С одинаковыми --seed и --end данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--comments-per-post', type=float, default=2.0,
+            help='Среднее число комментариев у поста.',
+        )
+        parser.add_argument(
+            '--follows-per-user', type=float, default=20.0,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --end распределены посты.',
+        )
+        parser.add_argument(
+            '--end', default=None,
+            help='Дата последнего поста, ГГГГ-ММ-ДД; по умолчанию сегодня.',
+        )
+        parser.add_argument('--seed', default='0')
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль всех пользователей; по умолчанию вход запрещён.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Сколько процессов генерируют строки.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов в одной порции и транзакции.',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать ленты, статистику и поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        end = parse_date(options['end']) if options['end'] else (
+            timezone.now().date()
+        )
+        if end is None:
+            raise CommandError('--end ожидается в виде ГГГГ-ММ-ДД')
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя.')
+        self.end = datetime.combine(end, datetime.min.time(), timezone.utc)
+        self.batch_size = options['batch_size']
+        config = {
+            'seed': options['seed'],
+            'users': options['users'],
+            'first_user': next_pk(User),
+            'groups': options['groups'],
+            'first_group': next_pk(Group),
+            'end': self.end,
+            'days': options['days'],
+            'comments_per_post': options['comments_per_post'],
+            'follows_per_user': options['follows_per_user'],
+            'password': self.password(
+                options['password'], options['seed']
+            ),
+        }
+        # дочерние процессы не должны делить соединения с родителем
+        connections.close_all()
+        if options['workers'] > 1:
+            pool = ProcessPoolExecutor(
+                options['workers'], initializer=synthetic.init,
+                initargs=(config,),
+            )
+        else:
+            pool = SerialPool(synthetic.init, (config,))
+        self.window = 2 * max(1, options['workers'])
+        try:
+            self.generate(pool, 'users', config['first_user'],
+                          options['users'], self.save_users)
+            self.generate(pool, 'groups', config['first_group'],
+                          options['groups'], self.save_groups)
+            self.generate(pool, 'posts', next_pk(Post), options['posts'],
+                          self.save_posts)
+            self.generate(pool, 'follows', config['first_user'],
+                          options['users'], self.save_follows)
+        finally:
+            pool.shutdown()
+        dataset.reset_sequences()
+        if not options['skip_derived']:
+            rebuild_derived(self.stdout)
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    @staticmethod
+    def password(raw, seed):
+        """Хеш пароля без случайной соли, чтобы данные повторялись."""
+        if raw is None:
+            return f'{UNUSABLE_PASSWORD_PREFIX}synthetic'
+        salt = hashlib.md5(f'{seed}:salt'.encode()).hexdigest()[:12]
+        return make_password(raw, salt)
+
+    def generate(self, pool, kind, first, total, save):
+        """
+        Генерирует порции в пуле и сохраняет их по порядку.
+
+        Впереди держится не больше self.window порций, чтобы готовые
+        строки не копились в памяти, пока база их вставляет.
+        """
+        function = getattr(synthetic, kind)
+        chunks = iter(enumerate(range(0, total, self.batch_size)))
+        pending = deque()
+        start, done, reported = time.monotonic(), 0, 0.0
+        while True:
+            for number, offset in chunks:
+                pending.append(pool.submit(
+                    function, number, first + offset,
+                    min(self.batch_size, total - offset),
+                ))
+                if len(pending) >= self.window:
+                    break
+            if not pending:
+                break
+            rows = pending.popleft().result()
+            with transaction.atomic():
+                save(rows)
+            done = min(total, done + self.batch_size)
+            elapsed = time.monotonic() - start
+            if elapsed - reported >= 1 or done == total:
+                reported = elapsed
+                self.stdout.write(
+                    f'{kind}: {done}/{total} '
+                    f'({done / max(elapsed, 1e-6):.0f}/с)'
+                )
+
+    def save_users(self, rows):
+        joined = self.end - timedelta(days=365)
+        User.objects.bulk_create([
+            User(
+                id=pk, username=username, first_name=first_name,
+                last_name=last_name, email=email, password=password,
+                date_joined=joined,
+            )
+            for pk, username, first_name, last_name, email, password in rows
+        ])
+
+    def save_groups(self, rows):
+        Group.objects.bulk_create([
+            Group(id=pk, title=title, slug=slug, description=description)
+            for pk, title, slug, description in rows
+        ])
+
+    def save_posts(self, rows):
+        posts, comments = rows
+        with dataset.explicit_dates(Post):
+            Post.objects.bulk_create([
+                Post(
+                    id=pk, text=text, pub_date=pub_date,
+                    author_id=author_id, group_id=group_id,
+                )
+                for pk, text, pub_date, author_id, group_id in posts
+            ])
+        with dataset.explicit_dates(Comment):
+            Comment.objects.bulk_create([
+                Comment(
+                    post_id=post_id, author_id=author_id, text=text,
+                    created=created,
+                )
+                for post_id, author_id, text, created in comments
+            ])
+
+    def save_follows(self, rows):
+        Follow.objects.bulk_create([
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in rows
+        ])
@@ -0,0 +1,41 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры и варианты картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Сколько процессов создают миниатюры.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='Сколько постов отдавать процессу за раз.',
+        )
+
+    def handle(self, *args, **options):
+        post_ids = list(
+            Post.objects.exclude(image='').values_list('pk', flat=True)
+        )
+        # дочерние процессы не должны делить соединения с родителем
+        connections.close_all()
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(options['workers']) as pool:
+                created = sum(pool.map(
+                    thumbnails.generate, post_ids,
+                    chunksize=options['chunk_size'],
+                ))
+        else:
+            created = sum(map(thumbnails.generate, post_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено постов: {len(post_ids)}, '
+            f'создано миниатюр и наборов вариантов: {created}'
+        ))
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import dataset
+
+from ._utils import rebuild_derived
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает NDJSON из export_site в пустую базу пачками bulk_create '
+        'и пересчитывает производные данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Файл выгрузки; по умолчанию stdin.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать ленты, статистику и поисковый индекс.',
+        )
+
+    def progress(self, label, loaded, seconds):
+        rate = loaded / seconds if seconds else 0
+        self.stdout.write(f'{label}: {loaded} ({rate:.0f} объектов/с)')
+
+    def handle(self, *args, **options):
+        stream = sys.stdin if options['input'] == '-' else open(
+            options['input'], encoding='utf-8'
+        )
+        try:
+            loaded = dataset.load(
+                stream, options['batch_size'], self.progress
+            )
+        except ValueError as error:
+            raise CommandError(f'Файл не загружен: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if not options['skip_derived']:
+            rebuild_derived(self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(loaded.values())}'
+        ))
@@ -0,0 +1,156 @@
+import json
+import random
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.test.utils import override_settings
+
+from posts import loadtest
+from posts.models import Post, User
+
+# сколько постов и авторов берётся в цели запросов
+TARGETS = 1000
+# случайные id проверяются пачками: SQLite принимает не больше 999
+# параметров в запросе; пачек не больше SAMPLE_ROUNDS
+SAMPLE_BATCH = 500
+SAMPLE_ROUNDS = 10
+COLUMNS = ('requests', 'errors%', 'rps', 'p50', 'p95', 'p99')
+
+
+def sample(queryset, rng, count):
+    """
+    До count случайных id строк queryset без чтения всей таблицы.
+
+    Кандидаты выбираются из диапазона id и проверяются пачками; в плотной
+    таблице, какую строит generate_dataset, хватает пары запросов.
+    """
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    candidates = range(bounds['low'], bounds['high'] + 1)
+    found = set()
+    for _ in range(SAMPLE_ROUNDS):
+        found.update(queryset.filter(pk__in=rng.sample(
+            candidates, min(SAMPLE_BATCH, len(candidates))
+        )).values_list('pk', flat=True))
+        if len(found) >= count or len(candidates) <= SAMPLE_BATCH:
+            break
+    return rng.sample(sorted(found), min(count, len(found)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает сайт смесью сценариев: анонимный просмотр главной '
+        'и постов, ленты подписок, комментарии, новые посты и подписки. '
+        'Печатает p50/p95/p99, запросы в секунду и долю ошибок по '
+        'маршрутам. Пишет в базу; запускать на синтетических данных '
+        'generate_dataset --password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default=None,
+            help='Адрес уже запущенного сайта с той же базой; '
+                 'по умолчанию сайт запускается в этом процессе.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Сколько процессов обслуживают встроенный сервер.',
+        )
+        parser.add_argument('--clients', type=int, default=10)
+        parser.add_argument(
+            '--duration', type=float, default=30.0,
+            help='Длительность прогона в секундах.',
+        )
+        parser.add_argument(
+            '--mix', default=None,
+            help='Веса сценариев, например browse=60,feed=20,comment=10,'
+                 'post=5,follow=5.',
+        )
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль пользователей для сценариев с входом.',
+        )
+        parser.add_argument('--seed', default='0')
+        parser.add_argument(
+            '--json', default=None,
+            help='Файл для сводки в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(
+                options['mix']
+            ) if options['mix'] else dict(loadtest.DEFAULT_MIX)
+        except loadtest.LoadTestError as error:
+            raise CommandError(error)
+        rng = random.Random(options['seed'])
+        targets = self.targets(rng)
+        credentials = self.credentials(rng, options)
+        if options['url']:
+            summary = self.run(options['url'], mix, targets, credentials,
+                               options)
+        else:
+            # без панели отладки и журнала SQL, как на боевом сервере
+            with override_settings(DEBUG=False):
+                url, stop = loadtest.serve(options['processes'])
+                try:
+                    summary = self.run(url, mix, targets, credentials,
+                                       options)
+                finally:
+                    stop()
+        self.report(summary)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(summary, output, indent=2)
+
+    def targets(self, rng):
+        posts = sample(Post.objects.all(), rng, TARGETS)
+        if not posts:
+            raise CommandError('В базе нет постов: сначала generate_dataset')
+        authors = set()
+        for start in range(0, len(posts), SAMPLE_BATCH):
+            authors.update(Post.objects.filter(
+                pk__in=posts[start:start + SAMPLE_BATCH]
+            ).values_list('author__username', flat=True))
+        return {'posts': posts, 'authors': sorted(authors)}
+
+    def credentials(self, rng, options):
+        if options['password'] is None:
+            return []
+        users = sample(User.objects.filter(is_active=True).exclude(
+            password__startswith=UNUSABLE_PASSWORD_PREFIX
+        ), rng, options['clients'])
+        return [
+            (username, options['password'])
+            for username in User.objects.filter(pk__in=users).values_list(
+                'username', flat=True
+            )
+        ]
+
+    def run(self, url, mix, targets, credentials, options):
+        self.stdout.write(
+            f'{options["clients"]} клиентов, {options["duration"]:g} с, '
+            f'{url}'
+        )
+        try:
+            return loadtest.run(
+                url, mix, options['clients'], options['duration'],
+                targets, credentials, options['seed'],
+            )
+        except loadtest.LoadTestError as error:
+            raise CommandError(error)
+
+    def report(self, summary):
+        self.stdout.write(
+            f'{"маршрут":<16}' + ''.join(f'{name:>10}' for name in COLUMNS)
+        )
+        for route, values in summary.items():
+            self.stdout.write(
+                f'{route:<16}{values["requests"]:>10}'
+                f'{values["error_rate"]:>10.1%}{values["rps"]:>10.1f}'
+                + ''.join(
+                    f'{values[name]:>10.1f}' for name in COLUMNS[3:]
+                )
+            )
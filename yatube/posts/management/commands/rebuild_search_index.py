@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {indexed}')
+        )
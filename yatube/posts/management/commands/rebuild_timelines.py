@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей по таблице Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='id читателя; можно указать несколько раз.',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if users is None:
+            FeedEntry.objects.exclude(
+                user_id__in=Follow.objects.values('user_id')
+            ).delete()
+            users = Follow.objects.order_by('user_id').values_list(
+                'user_id', flat=True
+            ).distinct().iterator()
+        rebuilt = 0
+        for user_id in users:
+            timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {rebuilt}')
+        )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import stats
+from posts.models import User, UserStats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет статистику пользователей с исходными таблицами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько пользователей сверять за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = list(stats.COUNTERS)
+        last_pk, checked, repaired = 0, 0, 0
+        while True:
+            users = list(stats.with_counts(
+                User.objects.filter(pk__gt=last_pk).order_by('pk')
+            ).values('pk', *fields)[:batch_size])
+            if not users:
+                break
+            last_pk = users[-1]['pk']
+            checked += len(users)
+            with transaction.atomic():
+                existing = UserStats.objects.select_for_update().in_bulk(
+                    [user['pk'] for user in users]
+                )
+                missing, drifted = [], []
+                for user in users:
+                    row = existing.get(user['pk'])
+                    if row is None:
+                        missing.append(UserStats(
+                            user_id=user['pk'],
+                            **{field: user[field] for field in fields}
+                        ))
+                    elif any(
+                        getattr(row, field) != user[field] for field in fields
+                    ):
+                        for field in fields:
+                            setattr(row, field, user[field])
+                        drifted.append(row)
+                UserStats.objects.bulk_create(missing)
+                UserStats.objects.bulk_update(drifted, fields)
+            repaired += len(missing) + len(drifted)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено пользователей: {checked}, исправлено: {repaired}'
+        ))
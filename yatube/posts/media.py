@@ -0,0 +1,88 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import images
+from .models import MediaFile, Post
+
+
+def names(image_name, image_variants):
+    """Файлы, на которые ссылается пост: картинка и её варианты."""
+    if not image_name:
+        return []
+    return [image_name, *images.variant_names(image_variants)]
+
+
+def _change(names, delta):
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=name) for name in counts], ignore_conflicts=True
+    )
+    groups = defaultdict(list)
+    for name, count in counts.items():
+        groups[count].append(name)
+    for count, group in groups.items():
+        MediaFile.objects.filter(name__in=group).update(
+            refcount=F('refcount') + delta * count, updated=timezone.now()
+        )
+
+
+def touch(name):
+    """
+    Откладывает сборку файла, который только что загрузили повторно.
+
+    Хранилище отдаёт имя существующего файла, а ссылка на него появится,
+    только когда сохранится пост. До этого файл без ссылок мог бы удалить
+    сборщик.
+    """
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=name)], ignore_conflicts=True
+    )
+    MediaFile.objects.filter(name=name).update(updated=timezone.now())
+
+
+def replace(old, new):
+    """Переносит ссылки со старого набора файлов на новый."""
+    old, new = Counter(old), Counter(new)
+    _change((new - old).elements(), 1)
+    _change((old - new).elements(), -1)
+
+
+def recount():
+    """Пересчитывает ссылки на файлы по всем постам."""
+    counts = Counter()
+    for image, image_variants in Post.objects.exclude(
+        image=''
+    ).values_list('image', 'image_variants').iterator():
+        counts.update(names(image, image_variants))
+    with transaction.atomic():
+        MediaFile.objects.update(refcount=0)
+        _change(counts.elements(), 1)
+
+
+def collect(grace):
+    """
+    Удаляет файлы без ссылок, не менявшиеся дольше grace секунд.
+
+    Строка счётчика удаляется до файла и только при нулевом счётчике
+    и старой отметке updated, поэтому файл, на который успел сослаться
+    новый пост или повторная загрузка, не пропадёт.
+    """
+    storage = Post.image.field.storage
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    deleted = 0
+    for name in list(MediaFile.objects.filter(
+        refcount__lte=0, updated__lt=cutoff
+    ).values_list('name', flat=True)):
+        with transaction.atomic():
+            if MediaFile.objects.filter(
+                name=name, refcount__lte=0, updated__lt=cutoff
+            ).delete()[0]:
+                storage.delete(name)
+                deleted += 1
+    return deleted
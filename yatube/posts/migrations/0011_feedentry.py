@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    for follow in Follow.objects.iterator():
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=follow.user_id, post_id=pk, pub_date=date)
+                for pk, date in Post.objects.filter(
+                    author_id=follow.author_id
+                ).values_list('pk', 'pub_date').iterator()
+            ),
+            # SQLite принимает не больше 999 параметров и 500 строк
+            # в одном INSERT, а у записи ленты три поля
+            batch_size=300,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_auto_20220526_2239'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Читатель')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='user-post'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('follows_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+    ]
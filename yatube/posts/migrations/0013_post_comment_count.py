@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+CHUNK_SIZE = 1000
+
+
+def fill_comment_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    last_pk = Post.objects.order_by('-pk').values_list('pk', flat=True).first()
+    for start in range(0, (last_pk or 0) + 1, CHUNK_SIZE):
+        Post.objects.filter(
+            pk__gt=start, pk__lte=start + CHUNK_SIZE
+        ).update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
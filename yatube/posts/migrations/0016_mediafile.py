@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:30
+
+import json
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import F
+import posts.storage
+
+
+def fill_refcounts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MediaFile = apps.get_model('posts', 'MediaFile')
+    counts = Counter()
+    for image, image_variants in Post.objects.exclude(
+        image=''
+    ).values_list('image', 'image_variants').iterator():
+        counts[image] += 1
+        try:
+            variants = json.loads(image_variants)['variants']
+        except (ValueError, TypeError, KeyError):
+            variants = []
+        counts.update(variant['name'] for variant in variants)
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=name) for name in counts], ignore_conflicts=True
+    )
+    for name, count in counts.items():
+        MediaFile.objects.filter(name=name).update(
+            refcount=F('refcount') + count
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('refcount', models.IntegerField(default=0, verbose_name='Ссылок')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Изменён')),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_refcounts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['refcount', 'updated'], name='mediafile_garbage_idx'),
+        ),
+    ]
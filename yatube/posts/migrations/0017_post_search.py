@@ -0,0 +1,76 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.fields
+from posts.stemmer import stems
+
+BATCH_SIZE = 1000
+CREATE = {
+    'sqlite': ['CREATE VIRTUAL TABLE posts_post_fts USING fts5(body)'],
+    'postgresql': [
+        'CREATE TABLE posts_post_fts ('
+        'rowid integer PRIMARY KEY REFERENCES posts_post (id) '
+        'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+        'body tsvector NOT NULL)',
+        'CREATE INDEX posts_post_fts_body_idx '
+        'ON posts_post_fts USING GIN (body)',
+    ],
+}
+INSERT = {
+    'sqlite': 'INSERT INTO posts_post_fts (rowid, body) VALUES (%s, %s)',
+    'postgresql': (
+        'INSERT INTO posts_post_fts (rowid, body) '
+        "VALUES (%s, to_tsvector('simple', %s))"
+    ),
+}
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE:
+        return
+    for sql in CREATE[vendor]:
+        schema_editor.execute(sql)
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', 'text')[:BATCH_SIZE])
+        if not posts:
+            break
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(INSERT[vendor], [
+                (pk, ' '.join(stems(text))) for pk, text in posts
+            ])
+        last_pk = posts[-1][0]
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute('DROP TABLE posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_mediafile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('body', posts.fields.SearchBodyField(verbose_name='Основы слов')),
+            ],
+            options={
+                'verbose_name': 'Поисковый индекс поста',
+                'verbose_name_plural': 'Поисковый индекс постов',
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
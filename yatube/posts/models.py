@@ -3,6 +3,10 @@ from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from . import images
+from .fields import SearchBodyField
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -22,6 +26,16 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно карточке поста, за один запрос на страницу."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'image_variants', 'comment_count',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста')
     pub_date = models.DateTimeField(
@@ -32,6 +46,7 @@ class Post(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
+        db_index=False,
         verbose_name='Автор'
     )
     group = models.ForeignKey(
@@ -40,28 +55,86 @@ class Post(models.Model):
         blank=True,
         null=True,
         related_name='posts',
+        db_index=False,
         verbose_name='Группа'
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки',
+        help_text='JSON с уменьшенными копиями картинки для srcset'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.MAX_NUM_CHARS_POST]
 
+    @property
+    def image_srcsets(self):
+        """Пары (формат, srcset) для тегов source в шаблонах."""
+        return images.srcsets(self.image, self.image_variants)
+
+
+class PostSearch(models.Model):
+    """
+    Строка полнотекстового индекса поста.
+
+    Таблицу создаёт миграция под конкретную СУБД, поэтому Django ею
+    не управляет. В body лежат основы слов текста поста.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry',
+        verbose_name='Пост'
+    )
+    body = SearchBodyField(verbose_name='Основы слов')
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+        verbose_name = 'Поисковый индекс поста'
+        verbose_name_plural = 'Поисковый индекс постов'
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
         verbose_name='Пост'
     )
     author = models.ForeignKey(
@@ -80,6 +153,12 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.MAX_NUM_CHARS_COMMENT]
@@ -96,6 +175,7 @@ class Follow(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='following',
+        db_index=False,
         verbose_name='Автор'
     )
 
@@ -107,7 +187,95 @@ class Follow(models.Model):
                 fields=['user', 'author'], name="user-author"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
 
     def clean(self):
         if self.user == self.author:
             raise ValidationError('User cannot signup for himself')
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        db_index=False,
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='user-post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков'
+    )
+    follows_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name='Комментариев'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class MediaFile(models.Model):
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Имя файла'
+    )
+    refcount = models.IntegerField(default=0, verbose_name='Ссылок')
+    updated = models.DateTimeField(auto_now=True, verbose_name='Изменён')
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+        indexes = [
+            models.Index(
+                fields=['refcount', 'updated'], name='mediafile_garbage_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+LAST = 'last'
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа (дата или число, id) в токен."""
+    key, pk = values
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat()
+    raw = json.dumps([key, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key, pk = json.loads(raw)
+        if isinstance(key, str):
+            key = parse_datetime(key)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not isinstance(key, (datetime, int, float)) or isinstance(key, bool):
+        return None
+    if not isinstance(pk, int) or isinstance(pk, bool):
+        return None
+    return key, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничный вывод по ключу (дата или число, id) без COUNT и OFFSET.
+
+    Страницы адресуются токенами ?after= и ?before=, поэтому новые записи
+    не сдвигают уже открытые страницы, а глубокие страницы читаются так же
+    быстро, как первая. Ключи — имена полей или аннотаций queryset.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id')):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def _seek(self, cursor, descending):
+        (key, pk_key), (value, pk) = self.keys, cursor
+        lookup = 'lt' if descending else 'gt'
+        return self.object_list.filter(
+            Q(**{f'{key}__{lookup}e': value}),
+            Q(**{f'{key}__{lookup}': value})
+            | Q(**{f'{pk_key}__{lookup}': pk}),
+        )
+
+    def _cursor(self, obj):
+        if isinstance(obj, dict):
+            return encode_cursor([obj[key] for key in self.keys])
+        return encode_cursor([getattr(obj, key) for key in self.keys])
+
+    def get_page(self, after=None, before=None):
+        descending = [f'-{key}' for key in self.keys]
+        limit = self.per_page + 1
+        after = after and decode_cursor(after)
+        if before == LAST:
+            items = list(self.object_list.order_by(*self.keys)[:limit])
+            has_previous, has_next = len(items) == limit, False
+            items = items[:self.per_page][::-1]
+        elif before and decode_cursor(before):
+            items = list(self._seek(decode_cursor(before), False).order_by(
+                *self.keys
+            )[:limit])
+            has_previous, has_next = len(items) == limit, True
+            items = items[:self.per_page][::-1]
+        else:
+            queryset = self.object_list
+            if after:
+                queryset = self._seek(after, True)
+            items = list(queryset.order_by(*descending)[:limit])
+            has_previous, has_next = bool(after), len(items) == limit
+            items = items[:self.per_page]
+        if items and has_previous:
+            self.previous_cursor = self._cursor(items[0])
+        if items and has_next:
+            self.next_cursor = self._cursor(items[-1])
+        number = 2 if has_previous else 1
+        self._num_pages = number + has_next
+        return self._get_page(items, number, self)
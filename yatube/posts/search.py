@@ -0,0 +1,116 @@
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .stemmer import WORD_RE, stem, stems
+
+BATCH_SIZE = 1000
+INSERT = {
+    'sqlite': 'INSERT INTO posts_post_fts (rowid, body) VALUES (%s, %s)',
+    'postgresql': (
+        'INSERT INTO posts_post_fts (rowid, body) '
+        "VALUES (%s, to_tsvector('simple', %s))"
+    ),
+}
+CLEAR = 'DELETE FROM posts_post_fts'
+DELETE = CLEAR + ' WHERE rowid IN ({})'
+RANK = {
+    'sqlite': '-bm25(posts_post_fts)',
+    'postgresql': "ts_rank(posts_post_fts.body, to_tsquery('simple', %s))",
+}
+
+
+def _expression(terms):
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(queryset, query):
+    """
+    Посты, содержащие все слова запроса, с релевантностью в rank.
+
+    Слова сравниваются по основам, поэтому «кошки» находит «кошка».
+    Чем больше rank, тем выше пост в выдаче. FTS5 не считает bm25 внутри
+    подзапроса, которым Django оборачивает count(), поэтому выдачу
+    листают курсором, а не номерами страниц.
+    """
+    terms = stems(query)
+    if not terms or connection.vendor not in INSERT:
+        queryset = queryset.filter(text__icontains=query) if terms else (
+            queryset.none()
+        )
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+    expression = _expression(terms)
+    params = [expression] if '%s' in RANK[connection.vendor] else []
+    return queryset.filter(search_entry__body__match=expression).annotate(
+        rank=RawSQL(RANK[connection.vendor], params, FloatField())
+    )
+
+
+def _delete(cursor, post_ids):
+    """
+    Удаляет строки индекса одним запросом вне транзакции.
+
+    QuerySet.delete() открыл бы транзакцию, а DELETE из виртуальной
+    таблицы FTS5 в ней сначала читает: SQLite тогда не ждёт другого
+    писателя, и запрос сразу падает с «database is locked».
+    """
+    cursor.execute(
+        DELETE.format(', '.join(['%s'] * len(post_ids))), post_ids
+    )
+
+
+def index(posts):
+    """Записывает посты в индекс, заменяя прежние строки."""
+    posts = list(posts)
+    if connection.vendor not in INSERT or not posts:
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, [post.pk for post in posts])
+        cursor.executemany(INSERT[connection.vendor], [
+            (post.pk, ' '.join(stems(post.text))) for post in posts
+        ])
+
+
+def unindex(post_id):
+    if connection.vendor in INSERT:
+        with connection.cursor() as cursor:
+            _delete(cursor, [post_id])
+
+
+def rebuild():
+    """Перестраивает индекс по всем постам пачками."""
+    if connection.vendor not in INSERT:
+        return 0
+    # как в _delete: без транзакции QuerySet.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(CLEAR)
+    last_pk, total = 0, 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by('pk').only(
+            'text'
+        )[:BATCH_SIZE])
+        if not posts:
+            return total
+        index(posts)
+        last_pk, total = posts[-1].pk, total + len(posts)
+
+
+def highlight(text, query):
+    """Текст с найденными словами в <mark>; остальное экранируется."""
+    terms = stems(query)
+    parts, position = [], 0
+    for match in WORD_RE.finditer(text):
+        word = stem(match.group())
+        if any(word.startswith(term) for term in terms):
+            parts += [
+                escape(text[position:match.start()]),
+                f'<mark>{escape(match.group())}</mark>',
+            ]
+            position = match.end()
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
@@ -0,0 +1,294 @@
+import threading
+
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    autocomplete, caching, media, search, stats, thumbnails, timeline
+)
+from .models import Comment, Follow, Group, Post, User
+
+AUTOCOMPLETE_FIELDS = {'username', 'first_name', 'last_name', 'is_active'}
+
+_deletion = threading.local()
+
+
+def deleting():
+    """
+    Посты и пользователи, которых сейчас удаляет этот поток.
+
+    Django шлёт pre_delete всем удаляемым объектам до удаления, а
+    post_delete родителя — после его комментариев и подписок. Пока
+    родитель в этих словарях, обработчики строк каскада ничего не делают,
+    а родитель пересчитывает всё разом в своём post_delete.
+    """
+    if not hasattr(_deletion, 'posts'):
+        _deletion.posts, _deletion.users = {}, {}
+    return _deletion
+
+
+def cascading(post_id=None, *user_ids):
+    state = deleting()
+    return post_id in state.posts or any(
+        user_id in state.users for user_id in user_ids
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def defer_post_cascade(sender, instance, **kwargs):
+    deleting().posts[instance.pk] = set(
+        Comment.objects.filter(post=instance).order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+    )
+
+
+@receiver(post_delete, sender=Post)
+def finish_post_cascade(sender, instance, **kwargs):
+    state = deleting()
+    authors = state.posts.pop(instance.pk, set()) - set(state.users)
+    stats.recount_many(authors, 'comments_count')
+    caching.bump(*(
+        f'profile:{username}' for username in User.objects.filter(
+            pk__in=authors
+        ).values_list('username', flat=True)
+    ))
+
+
+@receiver(pre_delete, sender=User)
+def defer_user_cascade(sender, instance, **kwargs):
+    posts = Post.objects.filter(author=instance).order_by()
+    deleting().users[instance.pk] = {
+        'posts': set(posts.values_list('pk', flat=True)),
+        'groups': set(posts.exclude(group=None).values_list(
+            'group__slug', flat=True
+        ).distinct()),
+        'commented': set(Comment.objects.filter(author=instance).exclude(
+            post__author=instance
+        ).order_by().values_list('post_id', flat=True).distinct()),
+        'followed': set(Follow.objects.filter(user=instance).values_list(
+            'author_id', flat=True
+        )),
+        'followers': set(Follow.objects.filter(author=instance).values_list(
+            'user_id', flat=True
+        )),
+    }
+
+
+@receiver(post_delete, sender=User)
+def finish_user_cascade(sender, instance, **kwargs):
+    pending = deleting().users.pop(instance.pk, None)
+    if pending is None:
+        return
+    stats.recount_many(pending['followed'], 'followers_count')
+    stats.recount_many(pending['followers'], 'follows_count')
+    commented = Post.objects.filter(pk__in=pending['commented'])
+    stats.recount_comments(commented)
+    namespaces = {'index', f'profile:{instance.username}'}
+    namespaces.update(f'post:{pk}' for pk in pending['posts'])
+    namespaces.update(f'group:{slug}' for slug in pending['groups'])
+    namespaces.update(f'follow:{pk}' for pk in pending['followers'])
+    namespaces.update(
+        f'profile:{username}' for username in User.objects.filter(
+            pk__in=pending['followed'] | pending['followers']
+        ).values_list('username', flat=True)
+    )
+    for post in commented.select_related('author', 'group'):
+        namespaces.update(caching.post_namespaces(
+            post, [post.group.slug] if post.group_id else [], feeds=False
+        ))
+    caching.bump(*namespaces)
+
+
+@receiver(post_save, sender=Post)
+def push_to_feeds(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.push(instance)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, raw=False, **kwargs):
+    if instance.image and not raw:
+        thumbnails.schedule(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or update_fields and not AUTOCOMPLETE_FIELDS & set(update_fields):
+        return
+    autocomplete.update_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    autocomplete.remove_user(instance)
+
+
+@receiver(post_save, sender=Group)
+def index_group(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.update_group(instance)
+
+
+@receiver(post_delete, sender=Group)
+def unindex_group(sender, instance, **kwargs):
+    autocomplete.remove_group(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    # ленту удалённого читателя и посты удалённого автора снимет каскад
+    if not cascading(None, instance.user_id, instance.author_id):
+        timeline.prune(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        field = 'posts_count' if sender is Post else 'comments_count'
+        stats.bump(instance.author_id, field, 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def count_deleted(sender, instance, **kwargs):
+    post_id = instance.post_id if sender is Comment else None
+    if cascading(post_id, instance.author_id):
+        return
+    field = 'posts_count' if sender is Post else 'comments_count'
+    stats.bump(instance.author_id, field, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, 'followers_count', 1)
+        stats.bump(instance.user_id, 'follows_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    if cascading(None, instance.user_id, instance.author_id):
+        return
+    stats.bump(instance.author_id, 'followers_count', -1)
+    stats.bump(instance.user_id, 'follows_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_post_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_post_comment(sender, instance, **kwargs):
+    if cascading(instance.post_id, instance.author_id):
+        return
+    stats.bump_comments(instance.post_id, -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    instance.previous_group_slug = None
+    instance.previous_media = []
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group__slug', 'image', 'image_variants'
+        ).first()
+        if previous:
+            instance.previous_group_slug = previous[0]
+            instance.previous_media = media.names(*previous[1:])
+
+
+@receiver(post_save, sender=Post)
+def count_media(sender, instance, raw=False, **kwargs):
+    if not raw:
+        media.replace(
+            getattr(instance, 'previous_media', []),
+            media.names(instance.image.name, instance.image_variants),
+        )
+
+
+@receiver(post_delete, sender=Post)
+def uncount_media(sender, instance, **kwargs):
+    media.replace(
+        media.names(instance.image.name, instance.image_variants), []
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    if raw or cascading(None, instance.author_id):
+        return
+    slugs = {getattr(instance, 'previous_group_slug', None)}
+    if instance.group_id:
+        slugs.add(instance.group.slug)
+    caching.bump(*caching.post_namespaces(instance, slugs))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if raw or cascading(instance.post_id, instance.author_id):
+        return
+    post = instance.post
+    slugs = [post.group.slug] if post.group_id else []
+    caching.bump(
+        *caching.post_namespaces(post, slugs, feeds=False),
+        f'profile:{instance.author.username}',
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, raw=False, **kwargs):
+    if not raw and not cascading(None, instance.user_id, instance.author_id):
+        caching.bump(
+            f'follow:{instance.user_id}',
+            f'profile:{instance.user.username}',
+            f'profile:{instance.author.username}',
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump('index', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, created=False, raw=False,
+                          update_fields=None, **kwargs):
+    if raw or update_fields == frozenset(['last_login']):
+        return
+    namespaces = ['index', f'profile:{instance.username}']
+    if not created:
+        # карточки постов в группах показывают имя автора
+        namespaces += [
+            f'group:{slug}' for slug in Group.objects.filter(
+                posts__author=instance
+            ).values_list('slug', flat=True).distinct()
+        ]
+    caching.bump(*namespaces)
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'follows_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def _count(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def with_counts(users):
+    """Аннотирует пользователей счётчиками из исходных таблиц."""
+    return users.annotate(**{
+        name: _count(model, field)
+        for name, (model, field) in COUNTERS.items()
+    })
+
+
+def recount(user_id):
+    """Пересчитывает статистику пользователя с нуля."""
+    counts = with_counts(User.objects.filter(pk=user_id)).values(
+        *COUNTERS
+    ).first()
+    if counts is None:
+        return None
+    return UserStats.objects.update_or_create(
+        user_id=user_id, defaults=counts
+    )[0]
+
+
+def bump(user_id, field, delta):
+    """Сдвигает счётчик на delta; строку без статистики пересчитывает."""
+    with transaction.atomic():
+        stats = UserStats.objects.filter(user_id=user_id)
+        if delta < 0:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+        if not stats.update(**{field: F(field) + delta}) and delta > 0:
+            recount(user_id)
+
+
+def recount_many(user_ids, field):
+    """Пересчитывает один счётчик у многих пользователей одним запросом."""
+    if not user_ids:
+        return
+    model, lookup = COUNTERS[field]
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: _count(model, lookup, 'user_id')}
+    )
+
+
+def for_user(user):
+    """Статистика для страницы пользователя."""
+    return (
+        UserStats.objects.filter(user=user).first()
+        or recount(user.pk)
+        or UserStats(user=user)
+    )
+
+
+def bump_comments(post_id, delta):
+    """Сдвигает счётчик комментариев поста на delta."""
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    posts.update(comment_count=F('comment_count') + delta)
+
+
+def recount_comments(posts):
+    """Пересчитывает comment_count у постов из queryset."""
+    return posts.update(comment_count=_count(Comment, 'post'))
@@ -0,0 +1,101 @@
+"""
+Стеммер русского языка по алгоритму Snowball.
+
+https://snowballstem.org/algorithms/russian/stemmer.html
+Слова не на кириллице только приводятся к нижнему регистру.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'\w+')
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им',
+    'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая',
+    'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = ((), ('ейше', 'ейш'))
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _remove(rv, endings):
+    """
+    Отрезает самое длинное подходящее окончание.
+
+    Окончания первой группы снимаются, только если перед ними а или я.
+    """
+    after_a, anywhere = endings
+    for ending in sorted(after_a + anywhere, key=len, reverse=True):
+        if not rv.endswith(ending):
+            continue
+        rest = rv[:-len(ending)]
+        if ending in anywhere or rest.endswith(('а', 'я')):
+            return rest, True
+    return rv, False
+
+
+def _region(word, start=0):
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _step_one(rv):
+    rv, found = _remove(rv, PERFECTIVE_GERUND)
+    if found:
+        return rv
+    rv, _ = _remove(rv, REFLEXIVE)
+    rv, found = _remove(rv, ADJECTIVE)
+    if found:
+        return _remove(rv, PARTICIPLE)[0]
+    rv, found = _remove(rv, VERB)
+    return rv if found else _remove(rv, NOUN)[0]
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    match = re.search(f'[{VOWELS}]', word)
+    if match is None:
+        return word
+    prefix, rv = word[:match.end()], _step_one(word[match.end():])
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = _region(word, _region(word))
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(prefix + rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+    if rv.endswith('нн'):
+        return prefix + rv[:-1]
+    rv, found = _remove(rv, SUPERLATIVE)
+    if found and rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def stems(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD_RE.findall(text)]
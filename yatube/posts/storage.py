@@ -0,0 +1,43 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, которое называет файлы по SHA-256 содержимого.
+
+    posts/photo.jpg сохраняется как posts/ab/cd/abcd…ef.jpg: два уровня
+    подкаталогов держат каталоги небольшими, а одинаковые загрузки
+    хранятся одним файлом. Ссылки на файлы считает posts.media.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), digest[:2], digest[2:4], digest + extension
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # models импортирует хранилище, поэтому media — здесь
+            from . import media
+
+            media.touch(name)
+            # сборщик мог удалить файл до отметки: тогда сохраняем заново
+            if self.exists(name):
+                return name
+        return super().save(name, content, max_length)
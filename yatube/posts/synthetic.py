@@ -0,0 +1,156 @@
+"""
+Генератор синтетических данных для нагрузочных тестов.
+
+Функции здесь не обращаются к базе и работают в процессах пула: каждая
+получает диапазон id и зерно порции и возвращает кортежи полей. Зерно
+порции выводится из общего зерна и номера порции, поэтому результат
+не зависит от числа процессов.
+
+Популярность (число подписчиков) убывает по степенному закону от id,
+активность (число постов) — тоже по степенному закону, но в случайном
+порядке пользователей. Если бы самые читаемые авторы ещё и писали
+больше всех, ленты подписок росли бы квадратично.
+"""
+import bisect
+import itertools
+import math
+import random
+from datetime import timedelta
+
+from faker import Faker
+
+LOCALE = 'ru_RU'
+# показатели степенного закона популярности и активности автора
+POPULARITY_EXPONENT = 1.1
+ACTIVITY_EXPONENT = 1.0
+# показатель Парето для числа подписок одного пользователя
+FOLLOWS_SHAPE = 2.0
+
+_state = {}
+
+
+def init(config):
+    """
+    Инициализатор процесса пула.
+
+    Запоминает общие параметры: seed, users, first_user, groups,
+    first_group, end, days, comments_per_post, follows_per_user, password
+    — и считает накопленные веса популярности и активности.
+    """
+    _state.update(config)
+    users = config['users']
+    _state['popularity'] = _cum_weights(users, POPULARITY_EXPONENT)
+    _state['activity'] = _cum_weights(users, ACTIVITY_EXPONENT)
+    _state['activity_order'] = list(range(users))
+    random.Random(f"{config['seed']}:activity").shuffle(
+        _state['activity_order']
+    )
+
+
+def _cum_weights(count, exponent):
+    return list(itertools.accumulate(
+        1 / (rank ** exponent) for rank in range(1, count + 1)
+    ))
+
+
+def _random(kind, number):
+    seed = f"{_state['seed']}:{kind}:{number}"
+    fake = Faker(LOCALE)
+    fake.seed_instance(seed)
+    return random.Random(seed), fake
+
+
+def _pick(rng, weights):
+    index = bisect.bisect(weights, rng.random() * weights[-1])
+    return min(index, len(weights) - 1)
+
+
+def _popular(rng):
+    """id пользователя, выбранного с весом его популярности."""
+    return _state['first_user'] + _pick(rng, _state['popularity'])
+
+
+def _active(rng):
+    """id пользователя, выбранного с весом его активности."""
+    index = _state['activity_order'][_pick(rng, _state['activity'])]
+    return _state['first_user'] + index
+
+
+def users(number, start, count):
+    _, fake = _random('users', number)
+    rows = []
+    for pk in range(start, start + count):
+        profile = fake.simple_profile()
+        first_name, _, last_name = profile['name'].partition(' ')
+        rows.append((
+            pk, f"{profile['username']}{pk}"[:150], first_name[:150],
+            last_name[:150], profile['mail'], _state['password'],
+        ))
+    return rows
+
+
+def groups(number, start, count):
+    _, fake = _random('groups', number)
+    return [
+        (pk, fake.catch_phrase()[:200], f'group-{pk}', fake.paragraph())
+        for pk in range(start, start + count)
+    ]
+
+
+def posts(number, start, count):
+    """
+    Посты с комментариями.
+
+    Автор поста выбирается по активности, половина постов попадает
+    в случайные группы, дата равномерна за days дней до end. Комментарии
+    приходят после поста, их число распределено геометрически со
+    средним comments_per_post.
+    """
+    rng, fake = _random('posts', number)
+    end, mean = _state['end'], _state['comments_per_post']
+    span = _state['days'] * 24 * 60 * 60
+    post_rows, comment_rows = [], []
+    for pk in range(start, start + count):
+        pub_date = end - timedelta(seconds=rng.randrange(span))
+        group = None
+        if _state['groups'] and rng.random() < 0.5:
+            group = _state['first_group'] + rng.randrange(_state['groups'])
+        post_rows.append((
+            pk, fake.text(max_nb_chars=rng.choice((80, 200, 600))),
+            pub_date, _active(rng), group,
+        ))
+        comments = int(rng.expovariate(math.log1p(1 / mean))) if mean else 0
+        for _ in range(comments):
+            created = pub_date + timedelta(seconds=rng.randrange(
+                int((end - pub_date).total_seconds()) + 1
+            ))
+            comment_rows.append((
+                pk, _state['first_user'] + rng.randrange(_state['users']),
+                fake.sentence(), created,
+            ))
+    return post_rows, comment_rows
+
+
+def follows(number, start, count):
+    """
+    Подписки пользователей start..start+count.
+
+    Число подписок распределено по Парето со средним follows_per_user,
+    авторы выбираются по популярности, поэтому у немногих авторов
+    оказывается большинство подписчиков.
+    """
+    rng, _ = _random('follows', number)
+    scale = _state['follows_per_user'] * (FOLLOWS_SHAPE - 1) / FOLLOWS_SHAPE
+    limit = _state['users'] - 1
+    rows = []
+    for user in range(start, start + count):
+        wanted = min(limit, int(rng.paretovariate(FOLLOWS_SHAPE) * scale))
+        authors = set()
+        for _ in range(wanted * 3):
+            if len(authors) == wanted:
+                break
+            author = _popular(rng)
+            if author != user:
+                authors.add(author)
+        rows += [(user, author) for author in sorted(authors)]
+    return rows
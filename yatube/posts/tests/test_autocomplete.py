@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import autocomplete
+from posts.models import Group, User
+
+AUTOCOMPLETE_URL = reverse('posts:autocomplete')
+
+
+@override_settings(AUTOCOMPLETE_CHECK_INTERVAL=0)
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.leo = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.lena = User.objects.create_user(username='lena')
+        cls.group = Group.objects.create(
+            title='Литературный клуб', slug='lit-club', description='-'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def complete(self, prefix):
+        return [value for _, value, _ in autocomplete.complete(prefix)]
+
+    def test_prefixes_of_names_and_titles(self):
+        """Находит по началу логина, имени, фамилии, слага и названия"""
+        self.assertEqual(self.complete('le'), ['lena', 'leo'])
+        self.assertEqual(self.complete('ТОЛ'), ['leo'])
+        self.assertEqual(self.complete('лев т'), ['leo'])
+        self.assertEqual(self.complete('клуб'), ['lit-club'])
+        self.assertEqual(self.complete('li'), ['lit-club'])
+        self.assertEqual(self.complete('x'), [])
+        self.assertEqual(self.complete('  '), [])
+
+    def test_loaded_once(self):
+        """Индекс загружается при первом обращении, дальше без запросов"""
+        with self.assertNumQueries(2):
+            self.complete('le')
+        with self.assertNumQueries(0):
+            self.complete('ли')
+            self.complete('ле')
+
+    def test_updated_in_place(self):
+        """Изменения применяются на месте, без перезагрузки"""
+        self.complete('le')
+        self.leo.username = 'tolstoy'
+        self.leo.save()
+        self.group.delete()
+        lev = User.objects.create_user(username='levin')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('le'), ['lena', 'levin'])
+            self.assertEqual(self.complete('li'), [])
+            self.assertEqual(self.complete('лев'), ['tolstoy'])
+        lev.is_active = False
+        lev.save()
+        self.assertEqual(self.complete('le'), ['lena'])
+
+    def test_last_login_does_not_touch_index(self):
+        """Вход пользователя не пишет в журнал изменений"""
+        head = autocomplete.head()
+        Client().force_login(self.lena)
+        self.assertEqual(autocomplete.head(), head)
+
+    def test_changes_applied_in_other_processes(self):
+        """Другой процесс применяет изменения из журнала без запросов"""
+        other = autocomplete.Index()
+        other.complete('le', 10)
+        leo = User.objects.get(pk=self.leo.pk)
+        leo.username = 'tolstoy'
+        leo.save()
+        Group.objects.get(pk=self.group.pk).delete()
+        User.objects.create_user(username='levin')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [value for _, value, _ in other.complete('le', 10)],
+                ['lena', 'levin'],
+            )
+            self.assertEqual(other.complete('li', 10), [])
+
+    def test_reloaded_when_log_lost(self):
+        """Без журнала, например после очистки кэша, индекс перезагружается"""
+        self.complete('le')
+        User.objects.filter(pk=self.lena.pk).update(username='helena')
+        cache.clear()
+        self.assertEqual(self.complete('le'), ['leo'])
+        self.assertEqual(self.complete('he'), ['helena'])
+
+    def test_reloaded_after_gap_in_log(self):
+        """Пропавшая из журнала запись приводит к перезагрузке"""
+        other = autocomplete.Index()
+        other.complete('le', 10)
+        User.objects.create_user(username='levin')
+        epoch, number = autocomplete.head()
+        cache.delete(autocomplete.CHANGE_KEY.format(epoch, number))
+        with self.assertNumQueries(2):
+            self.assertEqual(len(other.complete('le', 10)), 3)
+
+    def test_endpoint(self):
+        """Эндпоинт отдаёт подсказки со ссылками в JSON"""
+        response = Client().get(AUTOCOMPLETE_URL, {'q': 'Лит'})
+        self.assertEqual(response.json(), {'results': [{
+            'type': 'group',
+            'value': 'lit-club',
+            'label': 'Литературный клуб',
+            'url': reverse('posts:group_posts', args=['lit-club']),
+        }]})
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from posts import caching
+
+KEY = 'page:test'
+LOCK = caching.LOCK_KEY.format(KEY)
+OLD = ['old']
+NEW = ['new']
+
+
+class FetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.counted = caching.counters()
+
+    def counter(self, event):
+        return caching.counters()[event] - self.counted[event]
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def test_hit_after_miss(self):
+        """Повторное обращение берёт значение из кэша"""
+        self.assertEqual(caching.fetch(KEY, OLD, self.compute), 'value 1')
+        self.assertEqual(caching.fetch(KEY, OLD, self.compute), 'value 1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.counter('hit'), 1)
+        self.assertEqual(self.counter('miss'), 1)
+
+    def test_new_generation_recomputes(self):
+        """Смена поколения пересчитывает значение"""
+        caching.fetch(KEY, OLD, self.compute)
+        self.assertEqual(caching.fetch(KEY, NEW, self.compute), 'value 2')
+
+    def test_stale_value_while_locked(self):
+        """Пока пересчёт идёт в другом запросе, отдаётся прежнее значение"""
+        caching.fetch(KEY, OLD, self.compute)
+        cache.add(LOCK, 1)
+        self.assertEqual(caching.fetch(KEY, NEW, self.compute), 'value 1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.counter('stale'), 1)
+
+    @mock.patch('posts.caching.LOCK_TIMEOUT', 0.1)
+    def test_waits_for_lock_without_value(self):
+        """Без прежнего значения запрос ждёт блокировку, затем считает сам"""
+        cache.add(LOCK, 1)
+        self.assertEqual(caching.fetch(KEY, OLD, self.compute), 'value 1')
+        self.assertEqual(self.counter('lock_wait'), 1)
+        self.assertIn(LOCK, cache)
+
+    @override_settings(PAGE_CACHE_TTL=-1)
+    def test_expired_value_recomputed(self):
+        """Истёкшая запись пересчитывается при том же поколении"""
+        caching.fetch(KEY, OLD, self.compute)
+        self.assertEqual(caching.fetch(KEY, OLD, self.compute), 'value 2')
+        self.assertNotIn(LOCK, cache)
+
+    def test_uncacheable_value_not_stored(self):
+        """Значение, не прошедшее проверку, не кэшируется"""
+        caching.fetch(KEY, OLD, self.compute, lambda value: False)
+        self.assertEqual(caching.fetch(KEY, OLD, self.compute), 'value 2')
@@ -0,0 +1,168 @@
+import datetime as dt
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import models
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import search
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, User, UserStats
+)
+
+PUB_DATE = timezone.now() - dt.timedelta(days=30)
+# больше 500 строк в одном INSERT SQLite не принимает
+MANY_COMMENTS = 600
+
+
+class DatasetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Анна', password='secret'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Кошка спит', author=cls.author, group=cls.group
+        )
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=PUB_DATE)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Мяу'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def export(self):
+        call_command('export_site', output=self.path, stdout=StringIO())
+
+    def import_(self, *args):
+        out = StringIO()
+        call_command('import_site', self.path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют объекты, id и даты"""
+        self.export()
+        comment = Comment.objects.get()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.assertFalse(Post.objects.exists())
+        output = self.import_('--batch-size=1')
+        self.assertIn('posts.post: 1', output)
+        self.assertIn('объектов/с', output)
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date, PUB_DATE)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(Comment.objects.get().created, comment.created)
+        author = User.objects.get(username='author')
+        self.assertEqual(author.first_name, 'Анна')
+        self.assertTrue(author.check_password('secret'))
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author=author
+        ).exists())
+
+    def test_derived_data_rebuilt(self):
+        """После загрузки пересчитываются ленты, счётчики и индекс"""
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.import_()
+        self.assertEqual(Post.objects.get().comment_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(post=self.post.pk).exists())
+        self.assertEqual(
+            UserStats.objects.get(user__username='author').posts_count, 1
+        )
+        self.assertEqual(
+            list(search.search(Post.objects.all(), 'кошки')), [self.post]
+        )
+
+    def test_batches_larger_than_sqlite_insert(self):
+        """Пачка по умолчанию грузится, даже если в ней больше 500 строк"""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text=f'Мяу {number}')
+            for number in range(MANY_COMMENTS)
+        )
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.import_()
+        self.assertEqual(Comment.objects.count(), MANY_COMMENTS + 1)
+
+    def test_invalid_input(self):
+        """Неизвестная модель в файле — ошибка команды"""
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('{"model": "auth.permission", "fields": {}}\n')
+        with self.assertRaises(CommandError):
+            self.import_()
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, *args):
+        call_command(
+            'generate_dataset', '--users=30', '--groups=3', '--posts=60',
+            '--follows-per-user=4', '--end=2021-06-01', '--batch-size=25',
+            *args, stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('pk').values_list(
+                'pk', 'username', 'first_name', 'password'
+            )),
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author_id', 'group_id'
+            )),
+            sorted(Comment.objects.values_list(
+                'post_id', 'author_id', 'text', 'created'
+            )),
+            sorted(Follow.objects.values_list('user_id', 'author_id')),
+        )
+
+    def test_generates_consistent_graph(self):
+        """Данные связаны, подписки уникальны и не на себя"""
+        self.generate('--workers=1')
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertFalse(Follow.objects.filter(
+            user=models.F('author')
+        ).exists())
+        self.assertFalse(Comment.objects.filter(
+            created__lt=models.F('post__pub_date')
+        ).exists())
+        self.assertEqual(
+            Post.objects.aggregate(total=models.Sum('comment_count'))[
+                'total'
+            ],
+            Comment.objects.count(),
+        )
+        self.assertEqual(
+            FeedEntry.objects.count(),
+            Post.objects.annotate(
+                followers=models.Count('author__following')
+            ).aggregate(total=models.Sum('followers'))['total'],
+        )
+
+    def test_seed_makes_data_reproducible(self):
+        """Зерно задаёт данные независимо от числа процессов"""
+        self.generate('--workers=1', '--seed=7', '--skip-derived')
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.generate('--workers=2', '--seed=7', '--skip-derived')
+        self.assertEqual(self.snapshot(), first)
+        User.objects.all().delete()
+        self.generate('--workers=1', '--seed=8', '--skip-derived')
+        self.assertNotEqual(self.snapshot()[1], first[1])
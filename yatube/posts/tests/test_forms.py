@@ -30,6 +30,7 @@ REDIRECT_NON_AUTHOR = (
 )
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 IMAGE = Post.image.field.upload_to
+HASHED_NAME = IMAGE + r'[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
 SMALL_GIF = (
     b'\x47\x49\x46\x38\x39\x61\x02\x00'
     b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -143,7 +144,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.image, f'{IMAGE}{uploaded.name}')
+        self.assertRegex(post.image.name, HASHED_NAME)
 
     def test_can_update_post_with_group(self):
         """Обновление поста через форму работает корректно"""
@@ -169,7 +170,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.author, self.post.author)
-        self.assertEqual(post.image, f'{IMAGE}{uploaded.name}')
+        self.assertRegex(post.image.name, HASHED_NAME)
 
     def test_can_add_comment_to_existing_post(self):
         """Добавление комментария к посту через форму работает корректно"""
@@ -0,0 +1,124 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images, thumbnails
+from posts.models import Post, User
+
+USERNAME = 'HasNoName'
+POST_TEXT = 'Теcтовый пост один'
+POST_CREATE_URL = reverse('posts:post_create')
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+EXIF_ORIENTATION = 0x0112
+EXIF_ARTIST = 0x013B
+ROTATED_90 = 6
+# формат, который Pillow читает, но не записывает
+SMALL_XPM = (
+    b'/* XPM */\n'
+    b'static char *small[] = {\n'
+    b'"2 1 2 1",\n'
+    b'"r c #FF0000",\n'
+    b'"b c #0000FF",\n'
+    b'"rb"\n'
+    b'};\n'
+)
+
+
+def photo(width, height):
+    """JPEG с EXIF: автором и поворотом на 90 градусов."""
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = ROTATED_90
+    exif[EXIF_ARTIST] = 'Секретный автор'
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(
+        buffer, format='JPEG', exif=exif
+    )
+    return SimpleUploadedFile(
+        name='photo.jpg', content=buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    IMAGE_MAX_SIZE=200,
+    IMAGE_VARIANT_WIDTHS=(50, 100, 1000),
+)
+class ImagePipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.authorized = Client()
+        cls.authorized.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self):
+        with mock.patch('posts.thumbnails.schedule'):
+            self.authorized.post(POST_CREATE_URL, data={
+                'text': POST_TEXT, 'image': photo(400, 300),
+            })
+        return Post.objects.get()
+
+    def test_upload_is_resized_and_stripped(self):
+        """Загрузка уменьшается, поворачивается и теряет метаданные"""
+        post = self.create_post()
+        self.assertRegex(post.image.name, r'^posts/.*\.jpg$')
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (150, 200))
+            self.assertEqual(dict(stored.getexif()), {})
+
+    def test_read_only_format_saved_as_png(self):
+        """Картинка в формате без записи в Pillow хранится как PNG"""
+        with mock.patch('posts.thumbnails.schedule'):
+            response = self.authorized.post(POST_CREATE_URL, data={
+                'text': POST_TEXT, 'image': SimpleUploadedFile(
+                    name='small.xpm', content=SMALL_XPM,
+                    content_type='image/x-xpixmap'
+                ),
+            })
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get()
+        self.assertRegex(post.image.name, r'^posts/.*\.png$')
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'PNG')
+            self.assertEqual(stored.size, (2, 1))
+
+    def test_variants_served_in_srcset(self):
+        """Варианты подходящих ширин попадают в srcset карточки"""
+        post = self.create_post()
+        self.assertEqual(post.image_srcsets, [])
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        formats = dict(post.image_srcsets)
+        self.assertEqual(set(formats), set(images.variant_formats()))
+        self.assertIn('.jpeg 50w', formats['jpeg'])
+        self.assertIn('.jpeg 100w', formats['jpeg'])
+        self.assertNotIn('1000w', formats['jpeg'])
+        response = self.authorized.get(reverse('posts:index'))
+        self.assertContains(response, formats['jpeg'])
+
+    def test_variants_of_replaced_image_ignored(self):
+        """Варианты прежней картинки не показываются для новой"""
+        post = self.create_post()
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        post.image = 'posts/other.jpg'
+        self.assertEqual(post.image_srcsets, [])
+        post.image_variants = 'не JSON'
+        self.assertEqual(post.image_srcsets, [])
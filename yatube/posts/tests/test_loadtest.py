@@ -0,0 +1,179 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import (
+    LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+)
+
+from posts import loadtest
+from posts.management.commands.loadtest import sample
+from posts.models import Comment, Follow, Post, User
+
+PASSWORD = 'secret-password'
+CLIENTS = 4
+
+
+class LoadTestHelpersTests(SimpleTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix('browse=3, feed=1'),
+            {'browse': 3, 'feed': 1},
+        )
+        for text in ('unknown=1', 'browse=x', 'browse=-1', 'browse=0'):
+            with self.subTest(text=text):
+                with self.assertRaises(loadtest.LoadTestError):
+                    loadtest.parse_mix(text)
+
+    def test_summary(self):
+        stats = loadtest.Stats()
+        stats.record('index', 0.01, True)
+        stats.record('index', 0.03, False)
+        stats.record('follow_index', 0.02, True)
+        summary = stats.summary(elapsed=2)
+        self.assertEqual(summary['index']['requests'], 2)
+        self.assertEqual(summary['index']['error_rate'], 0.5)
+        self.assertEqual(summary['total']['requests'], 3)
+        self.assertEqual(summary['total']['errors'], 1)
+        self.assertEqual(summary['total']['rps'], 1.5)
+        self.assertAlmostEqual(summary['total']['p99'], 30)
+
+
+class TargetSampleTests(TestCase):
+    def test_sample_reads_bounded_batches(self):
+        """Цели выбираются по случайным id, без чтения всей таблицы"""
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(30)
+        )
+        ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        Post.objects.filter(pk__in=ids[::2]).delete()
+        existing = set(ids[1::2])
+        with self.assertNumQueries(2):
+            found = sample(Post.objects.all(), random.Random(0), 10)
+        self.assertEqual(len(found), 10)
+        self.assertLessEqual(set(found), existing)
+        self.assertEqual(
+            sorted(sample(Post.objects.all(), random.Random(0), 100)),
+            sorted(existing),
+        )
+        self.assertEqual(sample(Post.objects.none(), random.Random(0), 5), [])
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # с тестовой базой в памяти живой сервер делит с тестом одно
+        # соединение, и параллельные клиенты ломали бы его транзакции;
+        # на время этих тестов база копируется в файл, и каждый поток
+        # сервера открывает к нему своё соединение
+        handle, cls.database = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connection.ensure_connection()
+        copy = sqlite3.connect(cls.database)
+        connection.connection.backup(copy)
+        copy.close()
+        cls.memory = connection.connection, connection.settings_dict['NAME']
+        connection.connection = None
+        connection.settings_dict['NAME'] = cls.database
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connection.close()
+        connection.connection, connection.settings_dict['NAME'] = cls.memory
+        os.remove(cls.database)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.readers = [
+            User.objects.create_user(
+                username=f'reader{number}', password=PASSWORD
+            )
+            for number in range(CLIENTS)
+        ]
+        self.posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(3)
+        ]
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def loadtest(self, **options):
+        call_command(
+            'loadtest', clients=CLIENTS, duration=0.5, password=PASSWORD,
+            json=self.path, stdout=StringIO(), **options
+        )
+        with open(self.path, encoding='utf-8') as summary:
+            return json.load(summary)
+
+    def test_anonymous_browsing_on_builtin_server(self):
+        summary = self.loadtest(mix='browse=1')
+        self.assertEqual(
+            set(summary), {'index', 'post_detail', 'total'}
+        )
+        self.assertGreater(summary['total']['requests'], 0)
+        self.assertEqual(summary['total']['errors'], 0)
+
+    def test_mixed_traffic_against_url(self):
+        summary = self.loadtest(
+            url=self.live_server_url,
+            mix='feed=1,comment=1,post=1,follow=1',
+        )
+        self.assertEqual(summary['total']['errors'], 0)
+        self.assertEqual(
+            summary['add_comment']['requests'], Comment.objects.count()
+        )
+        self.assertEqual(
+            summary['post_create']['requests'],
+            Post.objects.count() - len(self.posts),
+        )
+        self.assertTrue(
+            Follow.objects.filter(user__in=self.readers).exists()
+        )
+
+    @override_settings(MAX_NUM_POSTS_PER_PAGE=1)
+    def test_browse_follows_cursor_links(self):
+        """Просмотр листает главную по ссылкам ?after=, а не ?page="""
+        stats = loadtest.Stats()
+        client = loadtest.Client(
+            self.live_server_url, stats,
+            {'posts': [post.pk for post in self.posts]}, random.Random(0),
+        )
+        with mock.patch.object(loadtest, 'PAGE_WEIGHTS', (0, 0, 0, 1)):
+            with mock.patch.object(
+                client.session, 'request', wraps=client.session.request
+            ) as request:
+                client.browse()
+        paths = [call.args[1] for call in request.call_args_list]
+        self.assertEqual(paths[0], self.live_server_url + '/')
+        self.assertEqual(len(paths), len(self.posts) + 1)
+        for path in paths[1:-1]:
+            self.assertIn('/?after=', path)
+        self.assertNotIn('page=', ''.join(paths))
+        self.assertEqual(stats.summary(1)['total']['errors'], 0)
+
+    def test_login_requires_password(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'loadtest', clients=1, duration=0.1, mix='feed=1',
+                stdout=StringIO(),
+            )
@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import thumbnails
+from posts.models import MediaFile, Post, User
+
+USERNAME = 'HasNoName'
+POST_TEXT = 'Теcтовый пост один'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.schedule')
+class MediaStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, content=SMALL_GIF, name='small.gif'):
+        return Post.objects.create(
+            text=POST_TEXT, author=self.user, image=SimpleUploadedFile(
+                name=name, content=content, content_type='image/gif'
+            )
+        )
+
+    def refcount(self, name):
+        return MediaFile.objects.get(name=name).refcount
+
+    def gc(self, *args):
+        call_command('gc_media', '--grace=-1', *args, stdout=StringIO())
+
+    def test_identical_uploads_share_one_file(self, schedule):
+        """Одинаковые загрузки хранятся одним файлом в подкаталогах"""
+        first = self.create_post()
+        second = self.create_post(name='copy.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/(\w\w)/(\w\w)/\1\2\w{60}\.gif$'
+        )
+        self.assertEqual(self.refcount(first.image.name), 2)
+
+    def test_gc_keeps_referenced_files(self, schedule):
+        """Сборщик не трогает файлы, на которые ещё ссылаются посты"""
+        first = self.create_post()
+        self.create_post()
+        first.delete()
+        self.gc()
+        self.assertEqual(self.refcount(first.image.name), 1)
+        self.assertTrue(first.image.storage.exists(first.image.name))
+
+    def test_gc_removes_replaced_and_deleted_files(self, schedule):
+        """Сборщик удаляет файлы после правки и удаления постов"""
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = SimpleUploadedFile(
+            name='other.gif', content=OTHER_GIF, content_type='image/gif'
+        )
+        post.save()
+        self.assertEqual(self.refcount(old_name), 0)
+        self.assertEqual(self.refcount(post.image.name), 1)
+        post.delete()
+        self.gc()
+        self.assertFalse(MediaFile.objects.exists())
+        for name in [old_name, post.image.name]:
+            self.assertFalse(post.image.storage.exists(name))
+
+    def test_reupload_postpones_gc(self, schedule):
+        """Повторная загрузка файла без ссылок откладывает его сборку"""
+        post = self.create_post()
+        post.delete()
+        MediaFile.objects.update(
+            updated=timezone.now() - timedelta(days=1)
+        )
+        storage = post.image.storage
+        name = storage.save('posts/copy.gif', SimpleUploadedFile(
+            name='copy.gif', content=SMALL_GIF, content_type='image/gif'
+        ))
+        self.assertEqual(name, post.image.name)
+        call_command('gc_media', '--grace=60', stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self.refcount(name), 0)
+
+    @override_settings(IMAGE_VARIANT_WIDTHS=(1,))
+    def test_variants_are_counted(self, schedule):
+        """Варианты картинки учитываются и удаляются вместе с постом"""
+        post = self.create_post()
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        variants = MediaFile.objects.exclude(name=post.image.name)
+        self.assertEqual(variants.count(), 1)
+        post.delete()
+        self.gc()
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_recount_repairs_drift(self, schedule):
+        """--recount восстанавливает счётчики по постам"""
+        post = self.create_post()
+        MediaFile.objects.update(refcount=0)
+        self.gc('--recount')
+        self.assertEqual(self.refcount(post.image.name), 1)
+        self.assertTrue(post.image.storage.exists(post.image.name))
@@ -0,0 +1,80 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'HasNoName'
+USERNAME_READER = 'Reader'
+TEST_SLUG = 'test-slug'
+HOMEPAGE_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_posts', args=[TEST_SLUG])
+PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+FOLLOW_LIST_URL = reverse('posts:follow_index')
+NUM_POSTS = 25
+FULL_SCAN = re.compile(r'^SCAN \S+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=USERNAME_READER)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(NUM_POSTS):
+            cls.post = Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Тест пост {i+1}'
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Коммент'
+            )
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', args=[cls.post.id]
+        )
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def hot_urls(self):
+        urls = [self.POST_DETAIL_URL]
+        for url in [HOMEPAGE_URL, GROUP_URL, PROFILE_URL, FOLLOW_LIST_URL]:
+            cache.clear()
+            page = self.reader_client.get(url).context['page_obj']
+            urls += [
+                url,
+                f'{url}?after={page.paginator.next_cursor}',
+                f'{url}?before={page.paginator.next_cursor}',
+                f'{url}?before=last',
+            ]
+        return urls
+
+    def test_hot_queries_use_indexes(self):
+        """Запросы горячих страниц не читают таблицы целиком и не сортируют"""
+        for url in self.hot_urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.reader_client.get(url)
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                for step in self.plan(query['sql']):
+                    with self.subTest(url=url, sql=query['sql'], step=step):
+                        self.assertNotRegex(step, FULL_SCAN)
+                        self.assertNotIn(TEMP_SORT, step)
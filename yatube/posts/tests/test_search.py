@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, PostSearch
+
+User = get_user_model()
+
+USERNAME = 'HasNoName'
+SEARCH_URL = reverse('posts:search')
+ADMIN_URL = reverse('admin:posts_post_changelist')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.cat = Post.objects.create(
+            text='Кошка спит на окне', author=cls.user
+        )
+        cls.cats = Post.objects.create(
+            text='Кошки, кошки и ещё раз кошки', author=cls.user
+        )
+        cls.dog = Post.objects.create(
+            text='Собака <лает> во дворе', author=cls.user
+        )
+
+    def found(self, query):
+        return list(
+            search.search(Post.objects.all(), query).order_by('-rank', '-id')
+        )
+
+    def test_search_matches_word_forms(self):
+        """Поиск находит другие формы слова и все слова запроса"""
+        self.assertEqual(self.found('кошкам'), [self.cats, self.cat])
+        self.assertEqual(self.found('спящая кошка'), [])
+        self.assertEqual(self.found('кошка окно'), [self.cat])
+        self.assertEqual(self.found('кош'), [self.cats, self.cat])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        self.dog.text = 'Теперь здесь живёт кошка'
+        self.dog.save()
+        self.assertIn(self.dog, self.found('кошка'))
+        self.assertEqual(self.found('собака'), [])
+        self.dog.delete()
+        self.assertFalse(PostSearch.objects.filter(pk=self.dog.pk).exists())
+        self.assertNotIn(self.dog, self.found('кошка'))
+
+    def test_highlight_escapes_text(self):
+        """Подсветка оборачивает найденные слова и экранирует текст"""
+        self.assertEqual(
+            search.highlight(self.dog.text, 'собакой'),
+            '<mark>Собака</mark> &lt;лает&gt; во дворе',
+        )
+
+    def test_search_page_pagination(self):
+        """Страница поиска листается курсором с сохранением запроса"""
+        for number in range(12):
+            Post.objects.create(
+                text=f'Кошка номер {number}', author=self.user
+            )
+        response = Client().get(SEARCH_URL, {'q': 'кошка'})
+        first = list(response.context['page_obj'])
+        self.assertEqual(len(first), 10)
+        self.assertIn('<mark>', first[0].highlighted)
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;after='
+        )
+        response = Client().get(SEARCH_URL, {
+            'q': 'кошка',
+            'after': response.context['page_obj'].paginator.next_cursor,
+        })
+        second = list(response.context['page_obj'])
+        self.assertEqual(len(second), 4)
+        self.assertFalse(set(first) & set(second))
+        response = Client().get(SEARCH_URL, {'q': 'кошка', 'page': 2})
+        self.assertEqual(list(response.context['page_obj']), first)
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по тому же индексу"""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(ADMIN_URL, {'q': 'кошкам'})
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.cat, self.cats}
+        )
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс по всем постам"""
+        PostSearch.objects.all().delete()
+        self.assertEqual(self.found('кошка'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(self.found('кошка'), [self.cats, self.cat])
@@ -0,0 +1,164 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+USERNAME = 'HasNoName'
+USERNAME_READER = 'Reader'
+POST_TEXT = 'Теcтовый пост один'
+COMMENT = 'Тестовый комментарий'
+PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+INDEX_URL = reverse('posts:index')
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=USERNAME_READER)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+        Comment.objects.create(post=cls.post, author=cls.user, text=COMMENT)
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.guest = Client()
+
+    def stats(self, user):
+        return UserStats.objects.values(
+            'posts_count', 'followers_count', 'follows_count',
+            'comments_count',
+        ).get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики обновляются при создании постов, комментариев, подписок"""
+        self.assertEqual(self.stats(self.user), {
+            'posts_count': 1,
+            'followers_count': 1,
+            'follows_count': 0,
+            'comments_count': 1,
+        })
+        self.assertEqual(self.stats(self.reader)['follows_count'], 1)
+
+    def test_counters_follow_deletes(self):
+        """Удаление поста каскадно уменьшает счётчики постов и комментариев"""
+        self.post.delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.stats(self.user), {
+            'posts_count': 0,
+            'followers_count': 0,
+            'follows_count': 0,
+            'comments_count': 0,
+        })
+        self.assertEqual(self.stats(self.reader)['follows_count'], 0)
+
+    def test_cascade_recounts_once(self):
+        """Удаление поста пересчитывает авторов комментариев разом"""
+        def delete_with_comments(count):
+            post = Post.objects.create(author=self.user, text=POST_TEXT)
+            for number in range(count):
+                Comment.objects.create(
+                    post=post, text=COMMENT,
+                    author=self.reader if number % 2 else self.user,
+                )
+            with CaptureQueriesContext(connection) as context:
+                post.delete()
+            return len(context)
+
+        self.assertEqual(delete_with_comments(2), delete_with_comments(10))
+        self.assertEqual(self.stats(self.user)['comments_count'], 1)
+        self.assertEqual(self.stats(self.reader)['comments_count'], 0)
+
+    def test_user_delete_recounts_related(self):
+        """Удаление пользователя пересчитывает счётчики остальных"""
+        leaving = User.objects.create_user(username='leaving')
+        kept = Post.objects.create(author=self.user, text=POST_TEXT)
+        post = Post.objects.create(author=leaving, text=POST_TEXT)
+        Follow.objects.create(user=leaving, author=self.user)
+        Follow.objects.create(user=self.reader, author=leaving)
+        Comment.objects.create(post=post, author=self.reader, text=COMMENT)
+        Comment.objects.create(post=kept, author=leaving, text=COMMENT)
+        Comment.objects.create(post=kept, author=self.user, text=COMMENT)
+        leaving.delete()
+        self.assertEqual(self.stats(self.reader), {
+            'posts_count': 0,
+            'followers_count': 0,
+            'follows_count': 1,
+            'comments_count': 0,
+        })
+        self.assertEqual(self.stats(self.user)['followers_count'], 1)
+        self.assertEqual(Post.objects.get(pk=kept.pk).comment_count, 1)
+
+    def test_profile_reads_stats(self):
+        """Профиль берёт счётчики из статистики, а не из COUNT-запросов"""
+        UserStats.objects.filter(user=self.user).update(posts_count=42)
+        response = self.guest.get(PROFILE_URL)
+        self.assertEqual(response.context['stats'].posts_count, 42)
+        self.assertContains(response, 'Всего постов: 42')
+
+    def test_reconcile_stats_repairs_drift(self):
+        """Команда reconcile_stats исправляет расхождения"""
+        UserStats.objects.filter(user=self.user).update(
+            posts_count=42, comments_count=7
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_stats', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.user)['posts_count'], 1)
+        self.assertEqual(self.stats(self.user)['comments_count'], 1)
+        self.assertEqual(self.stats(self.reader)['follows_count'], 1)
+
+
+class PostCommentCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=USERNAME_READER)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.POST_COMMENT_URL = reverse(
+            'posts:add_comment', args=[cls.post.id]
+        )
+
+    def comment_count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_add_comment_increments_count(self):
+        """add_comment увеличивает comment_count поста"""
+        self.reader_client.post(self.POST_COMMENT_URL, data={'text': COMMENT})
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_comment_delete_decrements_count(self):
+        """Удаление комментария, в том числе каскадное, уменьшает счётчик"""
+        Comment.objects.create(post=self.post, author=self.user, text=COMMENT)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text=COMMENT
+        )
+        Comment.objects.filter(author=self.user).delete()
+        self.assertEqual(self.comment_count(), 1)
+        self.reader.delete()
+        self.assertEqual(self.comment_count(), 0)
+
+    def test_feed_pages_do_not_touch_comments(self):
+        """Страницы-списки не обращаются к таблице комментариев"""
+        Comment.objects.create(post=self.post, author=self.user, text=COMMENT)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.reader_client.get(INDEX_URL)
+        self.assertEqual(response.context['page_obj'][0].comment_count, 1)
+        for query in context.captured_queries:
+            self.assertNotIn('posts_comment', query['sql'])
+
+    def test_backfill_comment_count_command(self):
+        """Команда backfill_comment_count пересчитывает счётчики"""
+        Comment.objects.create(post=self.post, author=self.user, text=COMMENT)
+        Post.objects.update(comment_count=0)
+        call_command(
+            'backfill_comment_count', chunk_size=1, stdout=StringIO()
+        )
+        self.assertEqual(self.comment_count(), 1)
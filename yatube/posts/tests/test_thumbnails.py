@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts import thumbnails
+from posts.models import Post, User
+
+USERNAME = 'HasNoName'
+POST_TEXT = 'Теcтовый пост один'
+NUM_POSTS = 3
+KVSTORE_TABLE = 'thumbnail_kvstore'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            cls.post = Post.objects.create(
+                text=POST_TEXT,
+                author=cls.user,
+                image=SimpleUploadedFile(
+                    name='small.gif', content=SMALL_GIF,
+                    content_type='image/gif'
+                ),
+            )
+        cls.scheduled = schedule.call_args_list
+        cls.guest = Client()
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', args=[cls.post.id]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_saving_image_schedules_generation(self):
+        """Сохранение поста с картинкой ставит миниатюры в очередь"""
+        self.assertEqual(self.scheduled, [mock.call(self.post)])
+
+    def test_placeholder_until_generated(self):
+        """Пока миниатюры нет, страница показывает заглушку"""
+        response = self.guest.get(self.POST_DETAIL_URL)
+        self.assertContains(response, thumbnails.PLACEHOLDER)
+        self.assertEqual(thumbnails.generate(self.post.pk), 2)
+        self.assertEqual(thumbnails.generate(self.post.pk), 0)
+        response = self.guest.get(self.POST_DETAIL_URL)
+        self.assertNotContains(response, thumbnails.PLACEHOLDER)
+        self.assertContains(
+            response, settings.MEDIA_URL + thumbnail_settings.THUMBNAIL_PREFIX
+        )
+
+    def test_generation_invalidates_cached_pages(self):
+        """Готовые миниатюры сразу попадают в закэшированные списки"""
+        self.assertContains(
+            self.guest.get(reverse('posts:index')), thumbnails.PLACEHOLDER
+        )
+        thumbnails.generate(self.post.pk)
+        self.assertNotContains(
+            self.guest.get(reverse('posts:index')), thumbnails.PLACEHOLDER
+        )
+
+    def test_list_pages_prefetch_thumbnails(self):
+        """Списки читают миниатюры всей страницы одним запросом к базе"""
+        with mock.patch('posts.thumbnails.schedule'):
+            for i in range(NUM_POSTS):
+                Post.objects.create(
+                    text=POST_TEXT, author=self.user, image=self.post.image
+                )
+        for url in [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[USERNAME]),
+        ]:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    response = self.guest.get(url)
+                self.assertEqual(len([
+                    query for query in context.captured_queries
+                    if KVSTORE_TABLE in query['sql']
+                ]), 1)
+                self.assertContains(
+                    response, thumbnails.PLACEHOLDER, count=NUM_POSTS + 1
+                )
+
+    def test_generate_thumbnails_command(self):
+        """Команда generate_thumbnails создаёт недостающие миниатюры"""
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn(
+            'создано миниатюр и наборов вариантов: 2', out.getvalue()
+        )
+        geometry, options = thumbnails.GEOMETRIES['card']
+        self.assertIsNotNone(
+            thumbnails.lookup(self.post.image, geometry, **options)
+        )
@@ -0,0 +1,81 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import FeedEntry, Follow, Post, User
+
+USERNAME = 'HasNoName'
+USERNAME_READER = 'Reader'
+POST_TEXT = 'Теcтовый пост один'
+FOLLOW_LIST_URL = reverse('posts:follow_index')
+FOLLOW_URL = reverse('posts:profile_follow', args=[USERNAME])
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[USERNAME])
+# больше, чем SQLite примет строк в одном INSERT
+MANY_POSTS = 600
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=USERNAME_READER)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def feed(self):
+        return list(
+            FeedEntry.objects.filter(user=self.reader).values_list(
+                'post_id', flat=True
+            )
+        )
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора"""
+        self.reader_client.get(FOLLOW_URL)
+        self.assertEqual(self.feed(), [self.post.id])
+
+    def test_new_post_pushed_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора"""
+        Follow.objects.create(user=self.reader, author=self.user)
+        post = Post.objects.create(author=self.user, text='Ещё пост')
+        self.assertIn(post.id, self.feed())
+        response = self.reader_client.get(FOLLOW_LIST_URL)
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_unfollow_prunes_feed(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.reader_client.get(UNFOLLOW_URL)
+        self.assertEqual(self.feed(), [])
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты по подпискам"""
+        Follow.objects.create(user=self.reader, author=self.user)
+        FeedEntry.objects.all().delete()
+        FeedEntry.objects.create(
+            user=self.user, post=self.post, pub_date=self.post.pub_date
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.post.id])
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+    def test_migration_fills_long_feeds(self):
+        """Миграция 0011 заполняет ленты авторов с сотнями постов"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=POST_TEXT)
+            for _ in range(MANY_POSTS)
+        )
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.user)
+        ])
+        FeedEntry.objects.all().delete()
+        import_module('posts.migrations.0011_feedentry').fill_feeds(
+            apps, None
+        )
+        self.assertEqual(len(self.feed()), MANY_POSTS + 1)
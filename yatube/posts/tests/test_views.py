@@ -4,7 +4,9 @@ import tempfile
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Follow, Comment, Group, Post, User
@@ -24,6 +26,9 @@ POST_CREATE_URL = reverse('posts:post_create')
 GROUP_URL = reverse('posts:group_posts', args=[TEST_SLUG])
 GROUP_ADD_URL = reverse('posts:group_posts', args=[TEST_SLUG_ADD])
 PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+NOT_AUTHOR_PROFILE_URL = reverse(
+    'posts:profile', args=[USERNAME_NOT_AUTHOR]
+)
 FOLLOW_URL = reverse('posts:profile_follow', args=[USERNAME])
 UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[USERNAME])
 HOMEPAGE_URL_SECOND_PAGE = f'{HOMEPAGE_URL}?page=2'
@@ -41,6 +46,11 @@ SMALL_GIF = (
 )
 
 
+def from_cache(response):
+    """Страница отдана из кэша: view не рендерил её шаблон."""
+    return response.context is None or 'page_obj' not in response.context
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostViewsTests(TestCase):
     @classmethod
@@ -72,12 +82,18 @@ class PostViewsTests(TestCase):
         cls.POST_DETAIL_URL = reverse(
             'posts:post_detail', args=[cls.post.id]
         )
+        cls.COMMENTS_URL = reverse(
+            'posts:post_comments', args=[cls.post.id]
+        )
 
     @classmethod
     def tearDownClass(cls):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     @staticmethod
     def create_image(filename):
         small_img = SMALL_GIF
@@ -92,16 +108,95 @@ class PostViewsTests(TestCase):
         """Проверка работы кэш на странице index"""
         cache.clear()
         response = self.client.get(HOMEPAGE_URL)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response_upd = self.client.get(HOMEPAGE_URL)
+        self.assertEqual(response_upd.content, response.content)
         post = Post.objects.create(
             author=self.user,
             text='some text',
         )
-        response_upd = self.client.get(HOMEPAGE_URL)
-        self.assertEqual(response_upd.content, response.content)
-        cache.clear()
         response_new = self.client.get(HOMEPAGE_URL)
         self.assertIn(post, response_new.context['page_obj'])
 
+    def test_cached_pages_invalidated_by_events(self):
+        """Кэш страниц сбрасывается ровно при изменении их данных"""
+        cache.clear()
+        Follow.objects.create(user=self.noauthor, author=self.user)
+        url_client = [
+            [HOMEPAGE_URL, self.guest],
+            [PROFILE_URL, self.guest],
+            [GROUP_URL, self.guest],
+            [FOLLOW_LIST_URL, self.another],
+        ]
+        for url, client in url_client:
+            client.get(url)
+        for url, client in url_client:
+            with self.subTest(url=url):
+                self.assertTrue(from_cache(client.get(url)))
+        Comment.objects.create(
+            post=self.post, author=self.noauthor, text='Новый коммент'
+        )
+        for url, client in url_client[:-1]:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.context['page_obj'][0], self.post)
+                self.assertEqual(
+                    response.context['page_obj'][0].comment_count, 1
+                )
+        # комментарий не сбрасывает ленты всех подписчиков автора
+        self.assertTrue(from_cache(self.another.get(FOLLOW_LIST_URL)))
+        self.guest.get(GROUP_ADD_URL)
+        self.assertTrue(from_cache(self.guest.get(GROUP_ADD_URL)))
+        self.group_two.description = 'Новое описание'
+        self.group_two.save()
+        self.assertFalse(from_cache(self.guest.get(GROUP_ADD_URL)))
+
+    def test_related_pages_invalidated_by_events(self):
+        """Кэш сбрасывается на профиле комментатора и в группах автора"""
+        cache.clear()
+        post = Post.objects.create(
+            text='Пост под удаление', author=self.user, group=self.group_one
+        )
+        self.guest.get(NOT_AUTHOR_PROFILE_URL)
+        Comment.objects.create(post=post, author=self.noauthor, text='Да')
+        response = self.guest.get(NOT_AUTHOR_PROFILE_URL)
+        self.assertFalse(from_cache(response))
+        self.assertEqual(response.context['stats'].comments_count, 1)
+        post.delete()
+        response = self.guest.get(NOT_AUTHOR_PROFILE_URL)
+        self.assertFalse(from_cache(response))
+        self.assertEqual(response.context['stats'].comments_count, 0)
+        self.guest.get(GROUP_URL)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        response = self.guest.get(GROUP_URL)
+        self.assertFalse(from_cache(response))
+        self.assertContains(response, 'Переименованный')
+
+    def test_shared_page_cache_renders_user_fragments(self):
+        """Общий кэш страниц не раскрывает чужие данные в шапке и кнопках"""
+        cache.clear()
+        Follow.objects.create(user=self.noauthor, author=self.user)
+        self.another.get(PROFILE_URL)
+        response = self.guest.get(PROFILE_URL)
+        self.assertTrue(from_cache(response))
+        self.assertNotContains(response, USERNAME_NOT_AUTHOR)
+        self.assertNotContains(response, 'Отписаться')
+        self.assertContains(response, 'Войти')
+        response = self.authorized.get(PROFILE_URL)
+        self.assertTrue(from_cache(response))
+        self.assertNotContains(response, 'Подписаться')
+        self.assertContains(response, 'Выйти')
+        response = self.another.get(HOMEPAGE_URL)
+        self.assertFalse(from_cache(response))
+        response = self.guest.get(HOMEPAGE_URL)
+        self.assertTrue(from_cache(response))
+        self.assertNotContains(response, 'Избранные авторы')
+        self.assertContains(
+            self.another.get(PROFILE_URL), 'Отписаться'
+        )
+
     def test_post_is_correctly_displayed_in_pages(self):
         """Созданный пост корректно отражается на всех страницах."""
         cache.clear()
@@ -171,6 +266,86 @@ class PostViewsTests(TestCase):
                     exp_num_posts
                 )
 
+    def test_cursor_pagination_is_stable_under_inserts(self):
+        """Курсорные страницы не сдвигаются при появлении новых постов"""
+        cache.clear()
+        Post.objects.bulk_create(
+            Post(
+                author=self.user,
+                text=f'Тест пост {i+1}',
+                group=self.group_one
+            ) for i in range(settings.MAX_NUM_POSTS_PER_PAGE + 2)
+        )
+        Follow.objects.create(
+            user=self.noauthor,
+            author=self.post.author,
+        )
+        for url, client in [
+            [HOMEPAGE_URL, self.authorized],
+            [PROFILE_URL, self.authorized],
+            [GROUP_URL, self.authorized],
+            [FOLLOW_LIST_URL, self.another],
+        ]:
+            with self.subTest(url=url):
+                cache.clear()
+                first = client.get(url).context['page_obj']
+                self.assertTrue(first.has_next())
+                self.assertFalse(first.has_previous())
+                Post.objects.create(
+                    author=self.user, text='Свежий пост', group=self.group_one
+                )
+                cache.clear()
+                second = client.get(
+                    f'{url}?after={first.paginator.next_cursor}'
+                ).context['page_obj']
+                self.assertTrue(second.has_previous())
+                self.assertFalse(set(first) & set(second))
+                self.assertEqual(
+                    len(first) + len(second), Post.objects.filter(
+                        pk__lte=max(post.pk for post in first)
+                    ).count()
+                )
+                cache.clear()
+                back = client.get(
+                    f'{url}?before={second.paginator.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_list_pages_run_fixed_number_of_queries(self):
+        """Число запросов страниц-списков не зависит от числа постов"""
+        Post.objects.filter(pk=self.post.pk).update(image='')
+        Follow.objects.create(
+            user=self.noauthor,
+            author=self.post.author,
+        )
+        url_client = [
+            [HOMEPAGE_URL, self.authorized],
+            [PROFILE_URL, self.authorized],
+            [GROUP_URL, self.authorized],
+            [FOLLOW_LIST_URL, self.another],
+        ]
+        queries = {}
+        for url, client in url_client:
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                client.get(url)
+            queries[url] = len(context)
+        for i in range(settings.MAX_NUM_POSTS_PER_PAGE):
+            post = Post.objects.create(
+                author=self.user,
+                text=f'Тест пост {i+1}',
+                group=self.group_one
+            )
+            Comment.objects.create(
+                post=post, author=self.noauthor, text='Коммент'
+            )
+        for url, client in url_client:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    client.get(url)
+                self.assertEqual(len(context), queries[url])
+
     def test_group_posts_page_show_correct_context(self):
         """Шаблон group_posts сформирован с правильным контекстом."""
         response = (self.authorized.get(GROUP_URL))
@@ -201,6 +376,81 @@ class PostViewsTests(TestCase):
         self.assertEqual(comments[0].text, comment_for_post.text)
         self.assertEqual(comments[0].author, comment_for_post.author)
 
+    def test_post_detail_pages_comments(self):
+        """Комментарии листаются курсором, авторы берутся одним join"""
+        per_page = settings.MAX_NUM_COMMENTS_PER_PAGE
+        for i in range(per_page + 3):
+            Comment.objects.create(
+                post=self.post, author=self.noauthor, text=f'Коммент {i}'
+            )
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized.get(self.POST_DETAIL_URL)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), per_page)
+        self.assertEqual(comments[0].text, f'Коммент {per_page + 2}')
+        self.assertLess(len(context), per_page)
+        older = self.guest.get(self.COMMENTS_URL, {
+            'after': comments.paginator.next_cursor,
+        })
+        self.assertEqual(
+            [comment.text for comment in older.context['comments']],
+            ['Коммент 2', 'Коммент 1', 'Коммент 0'],
+        )
+        self.assertNotContains(older, 'Показать ещё')
+        data = self.guest.get(self.COMMENTS_URL, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), per_page)
+        self.assertEqual(data['comments'][-1]['author'], USERNAME_NOT_AUTHOR)
+        data = self.guest.get(self.COMMENTS_URL, {
+            'format': 'json', 'after': data['next'],
+        }).json()
+        self.assertEqual(len(data['comments']), 3)
+        self.assertIsNone(data['next'])
+
+    def test_conditional_get(self):
+        """Неизменившиеся страницы отдаются как 304 до рендеринга"""
+        for url in (self.POST_DETAIL_URL, PROFILE_URL, GROUP_URL):
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                etag = response['ETag']
+                last_modified = response['Last-Modified']
+                queries = 1 if url == self.POST_DETAIL_URL else 0
+                with self.assertNumQueries(queries):
+                    response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                response = self.guest.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+                authorized = self.authorized.get(url)
+                self.assertNotEqual(authorized['ETag'], etag)
+                self.assertFalse(authorized.has_header('Last-Modified'))
+
+    def test_conditional_get_sees_changes(self):
+        """ETag страниц меняется вместе с их данными"""
+        pages = (self.POST_DETAIL_URL, PROFILE_URL, GROUP_URL)
+        etags = {url: self.guest.get(url)['ETag'] for url in pages}
+        Comment.objects.create(
+            post=self.post, author=self.noauthor, text='Новый коммент'
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.guest.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_sees_commenter_profile(self):
+        """Комментарий к чужому посту меняет ETag профиля комментатора"""
+        etag = self.guest.get(NOT_AUTHOR_PROFILE_URL)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.noauthor, text='Новый коммент'
+        )
+        response = self.guest.get(
+            NOT_AUTHOR_PROFILE_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats'].comments_count, 1)
+
     def test_follow_author_works_correctly(self):
         """Проверка создания подписки на автора"""
         self.another.get(FOLLOW_URL)
@@ -0,0 +1,155 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.templatetags.static import static
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching, images, media
+from .models import Post
+
+GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+PLACEHOLDER = 'img/placeholder.svg'
+
+logger = logging.getLogger(__name__)
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class Placeholder:
+    """Заглушка на время, пока миниатюра готовится в фоне."""
+
+    def __init__(self, geometry):
+        self.url = static(PLACEHOLDER)
+        self.width, _, self.height = geometry.partition('x')
+
+
+def thumbnail_file(image, geometry, **options):
+    """
+    Файл миниатюры без обращения к хранилищам.
+
+    Имя миниатюры считается так же, как в ThumbnailBackend.get_thumbnail,
+    но исходное изображение не открывается и не масштабируется.
+    """
+    backend = default.backend
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(
+        ImageFile(image), geometry, options
+    )
+    return ImageFile(name, default.storage)
+
+
+def lookup(image, geometry, **options):
+    """Готовая миниатюра из хранилища ключей sorl или None."""
+    return default.kvstore.get(thumbnail_file(image, geometry, **options))
+
+
+def prefetch(posts, preset='card'):
+    """Читает метаданные миниатюр всей страницы постов одним запросом."""
+    geometry, options = GEOMETRIES[preset]
+    default.kvstore.prefetch([
+        thumbnail_file(post.image, geometry, **options)
+        for post in posts if post.image
+    ])
+
+
+def thumbnail(image, preset):
+    """Миниатюра пресета; если её ещё нет, ставит пост в очередь."""
+    geometry, options = GEOMETRIES[preset]
+    found = lookup(image, geometry, **options)
+    if found is None:
+        schedule(image.instance)
+        return Placeholder(geometry)
+    return found
+
+
+def generate(post_id):
+    """
+    Создаёт недостающие миниатюры и варианты картинки поста.
+
+    Если что-то было создано, сбрасывает кэш страниц поста.
+    """
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None or not post.image:
+        return 0
+    created = 0
+    for geometry, options in GEOMETRIES.values():
+        if lookup(post.image, geometry, **options) is None:
+            get_thumbnail(post.image, geometry, **options)
+            created += 1
+    if not images.is_current(post.image, post.image_variants):
+        variants = images.make_variants(post.image, GEOMETRIES['card'][0])
+        Post.objects.filter(pk=post.pk).update(image_variants=variants)
+        media.replace(
+            images.variant_names(post.image_variants),
+            images.variant_names(variants),
+        )
+        created += 1
+    if created:
+        slugs = [post.group.slug] if post.group_id else []
+        caching.bump(*caching.post_namespaces(post, slugs))
+    return created
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры поста %s', post_id)
+    finally:
+        with _lock:
+            _pending.discard(post_id)
+        connection.close()
+
+
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _submit(post_id):
+    with _lock:
+        if post_id in _pending:
+            return
+        _pending.add(post_id)
+    executor().submit(_run, post_id)
+
+
+def schedule(post):
+    """Отправляет пост в фоновый пул после фиксации транзакции."""
+    transaction.on_commit(lambda: _submit(post.pk))
+
+
+def shutdown():
+    """
+    Дожидается поставленных задач и останавливает пул.
+
+    Следующая задача создаст новый пул. Нужен тестам: задачи не должны
+    писать в базу и файлы, которые тест уже очищает.
+    """
+    global _executor
+    with _lock:
+        pool, _executor = _executor, None
+    if pool is not None:
+        pool.shutdown(wait=True)
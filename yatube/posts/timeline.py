@@ -0,0 +1,54 @@
+from django.db import transaction
+
+from .models import FeedEntry, Follow, Post
+
+# SQLite принимает не больше 999 параметров и 500 строк в одном INSERT,
+# а у записи ленты три поля
+BATCH_SIZE = 300
+
+
+def _entries(post_rows, user_ids):
+    return (
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in post_rows
+        for user_id in user_ids
+    )
+
+
+def push(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        _entries([(post.pk, post.pub_date)], followers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту читателя все посты нового автора подписки."""
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        _entries(posts.iterator(), [follow.user_id]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(follow):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту читателя по его текущим подпискам."""
+    with transaction.atomic():
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        for follow in Follow.objects.filter(user_id=user_id):
+            backfill(follow)
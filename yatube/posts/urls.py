@@ -8,8 +8,16 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.post_search, name='search'),
+    path(
+        'autocomplete/', views.post_autocomplete, name='autocomplete'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
+    path(
+        'posts/<int:post_id>/comments/', views.post_comments,
+        name='post_comments'
+    ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='update_post'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
@@ -1,55 +1,144 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import F
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.utils.http import urlencode
 
 
+from . import autocomplete, search, stats, thumbnails
+from .caching import cached_page, conditional_page
 from .forms import CommentForm, PostForm
 from .models import Follow, Post, Group, User
+from .paginator import CursorPaginator
 
 
-def page(object, request):
-    return Paginator(
-        object, settings.MAX_NUM_POSTS_PER_PAGE).get_page(
-            request.GET.get('page')
-    )
+def page(object, request, keys=('pub_date', 'id'), numbered=True):
+    if numbered and 'page' in request.GET:
+        page_obj = Paginator(
+            object.order_by(*(f'-{key}' for key in keys)),
+            settings.MAX_NUM_POSTS_PER_PAGE,
+        ).get_page(request.GET.get('page'))
+    else:
+        page_obj = CursorPaginator(
+            object, settings.MAX_NUM_POSTS_PER_PAGE, keys
+        ).get_page(request.GET.get('after'), request.GET.get('before'))
+    thumbnails.prefetch(page_obj)
+    return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+@cached_page('index', shared=True)
 def index(request):
     return render(request, 'posts/index.html', {
-        'page_obj': page(Post.objects.all(), request)
+        'page_obj': page(Post.objects.for_feed(), request)
     })
 
 
+@conditional_page('group:{slug}')
+@cached_page('group:{slug}', shared=True)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': page(group.posts.all(), request),
+        'page_obj': page(group.posts.for_feed(), request),
     })
 
 
+@conditional_page('profile:{username}')
+@cached_page('profile:{username}', shared=True)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    following = (
-        request.user.is_authenticated and Follow.objects.filter(
-            user=request.user,
-            author=author,
-        ).exists() and request.user != author
-    )
     return render(request, 'posts/profile.html', {
         'author': author,
-        'page_obj': page(author.posts.all(), request),
-        'following': following,
+        'stats': stats.for_user(author),
+        'page_obj': page(author.posts.for_feed(), request),
     })
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = page(
+        search.search(Post.objects.for_feed(), query), request,
+        keys=('rank', 'id'), numbered=False,
+    )
+    for post in page_obj:
+        post.highlighted = search.highlight(post.text, query)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'query_string': urlencode({'q': query}) + '&',
+        'page_obj': page_obj,
+    })
+
+
+def post_autocomplete(request):
+    routes = {
+        autocomplete.USER: 'posts:profile',
+        autocomplete.GROUP: 'posts:group_posts',
+    }
+    return JsonResponse({'results': [
+        {
+            'type': kind,
+            'value': value,
+            'label': label,
+            'url': reverse(routes[kind], args=[value]),
+        }
+        for kind, value, label in autocomplete.complete(
+            request.GET.get('q', '')
+        )
+    ]})
+
+
+def comments_page(post, request):
+    return CursorPaginator(
+        post.comments.select_related('author'),
+        settings.MAX_NUM_COMMENTS_PER_PAGE,
+        ('created', 'id'),
+    ).get_page(request.GET.get('after'))
+
+
+def post_related_namespaces(post_id):
+    """Автор и группа поста тоже видны на его странице."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if row is None:
+        return []
+    username, slug = row
+    return [f'profile:{username}'] + ([f'group:{slug}'] if slug else [])
+
+
+@conditional_page('post:{post_id}', post_related_namespaces)
 def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.select_related('author'), pk=post_id)
     return render(request, 'posts/post_detail.html', {
-        'post': get_object_or_404(Post, pk=post_id),
+        'post': post,
+        'stats': stats.for_user(post.author),
         'form': CommentForm(request.POST or None),
+        'comments': comments_page(post, request),
+    })
+
+
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(post, request)
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comment_list.html', {
+            'post': post,
+            'comments': comments,
+        })
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            }
+            for comment in comments
+        ],
+        'next': comments.paginator.next_cursor,
     })
 
 
@@ -94,10 +183,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@cached_page('follow:{user}')
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user).all()
+    posts = Post.objects.for_feed().filter(
+        feed_entries__user=request.user
+    ).annotate(
+        feed_date=F('feed_entries__pub_date'),
+        feed_post=F('feed_entries__post'),
+    )
     return render(request, 'posts/follow.html', {
-        'page_obj': page(posts.all(), request)
+        'page_obj': page(posts, request, keys=('feed_date', 'feed_post'))
     })
 
 
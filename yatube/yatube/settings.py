@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -50,11 +51,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,7 +73,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -153,11 +156,89 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MAX_NUM_POSTS_PER_PAGE = 10
 MAX_NUM_CHARS_POST = 30
 MAX_NUM_CHARS_COMMENT = 30
+MAX_NUM_COMMENTS_PER_PAGE = 20
+# потоки фоновой генерации миниатюр в каждом процессе
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+# загрузки пишутся во временный файл, а не в память
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# наибольшая сторона хранимой картинки, px
+IMAGE_MAX_SIZE = 2560
+# ширины вариантов картинки для srcset, px
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
 
+# кэш процесса перед общим для всех воркеров кэшем в файлах
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+# manage.py test переносит общий кэш и метрики во временный каталог
+TEST_RUNNER = 'core.test_runner.TestRunner'
+# через сколько секунд закэшированная страница пересчитывается,
+# даже если её данные не менялись
+PAGE_CACHE_TTL = 60 * 5
+# сколько подсказок отдаёт автодополнение и как часто, в секундах,
+# индекс процесса проверяет общий журнал изменений
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_CHECK_INTERVAL = 1
+
+# метрики Prometheus: файлы процессов в общей памяти, как часто процесс
+# их обновляет (в секундах) и токен для /metrics; без токена метрики
+# видят только сотрудники
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    'yatube-metrics',
+))
+METRICS_FLUSH_INTERVAL = 1
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# медленные SQL-запросы: порог в миллисекундах (None — не замерять) и
+# не больше SLOW_QUERY_LOG_LIMIT записей за SLOW_QUERY_LOG_PERIOD секунд
+# в каждом процессе
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_LOG_LIMIT = 10
+SLOW_QUERY_LOG_PERIOD = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'core.slow_queries.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(BASE_DIR, 'slow_queries.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'core.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
 
 INTERNAL_IPS = [
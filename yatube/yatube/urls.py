@@ -3,11 +3,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', metrics, name='metrics'),
     path('', include('posts.urls', namespace='posts')),
 ]
 